@@ -0,0 +1,392 @@
+"""
+Seeded Monte-Carlo stress test of the AHU trim and respond resets.
+
+Thousands of synthetic AHUs, each with its own VAV zones, run the SAT and
+duct static pressure resets together for many simulated hours. Each zone
+is a first order thermal model cooled by its VAV box: airflow follows the
+damper and the square root of duct static, and the damper integrates the
+zone temperature error. The T&R rules are the ones in
+ahu_temperature_reset_sim and ahu_static_pressure_sim (their constants,
+requests and trim_respond core), applied to every AHU in one batch per
+tick, so tuning those modules is what gets tested here.
+
+Reports setpoint oscillation, request statistics and simulated ticks per
+second.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "TrimAndRespond"))
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+sys.path.append(os.path.join(_REPO_DIR, "AhuTempSetpointReset"))
+sys.path.append(os.path.join(_REPO_DIR, "AhuPressureSetpointReset"))
+from trim_respond import threshold_requests, net_requests, trim_respond
+import aso_metrics
+import ahu_temperature_reset_sim as sat_rules
+import ahu_static_pressure_sim as sp_rules
+
+logger = logging.getLogger(__name__)
+
+# Simulation Parameters
+NUM_AHUS = 5000
+NUM_ZONES = 40  # VAV zones per AHU
+SIM_HOURS = 24
+SETTLE_HOURS = 1  # Start up transient left out of the statistics
+TICK_SECONDS = 120  # G36 T&R time step
+SEED = 0
+
+# Zone Model
+ZONE_COOLING_SPT = 73.0  # VAV zone cooling setpoint in °F
+ZONE_TAU = 20 * 60  # Zone thermal time constant in seconds
+ZONE_LOAD_GAIN = 12.0  # °F of zone rise per unit of unmet design load
+DESIGN_DELTA_T = 20.0  # Zone to supply air °F at design cooling
+DESIGN_STATIC = 1.5  # Duct static in inches WC for design airflow
+DAMPER_MIN = 0.15  # VAV minimum damper position
+DAMPER_GAIN = 0.05  # Damper change per °F of zone error per minute
+AHU_LOAD_RANGE = (0.4, 1.3)  # Peak load fraction drawn per AHU
+ZONE_LOAD_RANGE = (0.4, 1.0)  # Peak load fraction drawn per zone
+LOAD_WEATHER_SHARE = 0.6  # Share of zone load that follows OAT
+LOAD_NOISE = 0.01  # Per tick noise of internal gains (design load units)
+LOAD_NOISE_DECAY = 0.98  # Internal gain noise decays back to 0 (AR(1))
+
+# Weather
+OAT_MEAN_RANGE = (60.0, 85.0)  # Daily mean OAT drawn per AHU
+OAT_SWING_RANGE = (5.0, 12.0)  # Daily OAT amplitude drawn per AHU
+OAT_PEAK_HOUR = 15
+OAT_NOISE = 0.3
+
+
+def dynamic_sat_max(oat):
+    """Vectorized sat_rules.calculate_dynamic_SPmax."""
+    fraction = np.clip(
+        (oat - sat_rules.OATmin) / (sat_rules.OATmax - sat_rules.OATmin), 0.0, 1.0
+    )
+    return sat_rules.SPmax_default - (
+        sat_rules.SPmax_default - sat_rules.high_oat_SPmax
+    ) * fraction
+
+
+def sat_reset_step(sat, zone_temps, oat):
+    """
+    adjust_SAT for every AHU, zone_temps is (ahus, zones). Returns
+    (new_sat, adjustment, num_requests).
+    """
+    num_requests = net_requests(
+        threshold_requests(zone_temps, sat_rules.HighZoneTempSpt), sat_rules.I
+    )
+    new_sat, adjustment = trim_respond(
+        sat,
+        num_requests,
+        sat_rules.SPtrim,
+        sat_rules.SPres,
+        sat_rules.SPres_max,
+        sat_rules.SPmin,
+        dynamic_sat_max(oat),
+    )
+    return new_sat, adjustment, num_requests
+
+
+def static_reset_step(static, dampers):
+    """
+    adjust_static_pressure for every AHU, dampers is (ahus, zones).
+    Returns (new_static, adjustment, num_requests).
+    """
+    num_requests = net_requests(
+        threshold_requests(dampers, sp_rules.HighDamperSpt), sp_rules.I
+    )
+    new_static, adjustment = trim_respond(
+        static,
+        num_requests,
+        sp_rules.SPtrim,
+        sp_rules.SPres,
+        sp_rules.SPres_max,
+        sp_rules.SPmin,
+        sp_rules.SPmax,
+    )
+    return new_static, adjustment, num_requests
+
+
+def _verify_against_scalar_rules(
+    sat, zone_temps, oat, new_sat, static, dampers, new_static, count
+):
+    """Replay the first `count` AHUs through the original scalar functions."""
+    for ahu in range(min(count, len(sat))):
+        requests = sat_rules.calculate_requests(zone_temps[ahu].tolist())
+        expected_sat, _, _ = sat_rules.adjust_SAT(
+            float(sat[ahu]), requests, sat_rules.calculate_dynamic_SPmax(float(oat[ahu]))
+        )
+        requests = sp_rules.calculate_requests(dampers[ahu].tolist())
+        expected_static, _, _ = sp_rules.adjust_static_pressure(float(static[ahu]), requests)
+        if not (
+            np.isclose(expected_sat, new_sat[ahu])
+            and np.isclose(expected_static, new_static[ahu])
+        ):
+            raise RuntimeError(
+                f"AHU {ahu}: batch SAT {new_sat[ahu]:.3f} / static {new_static[ahu]:.3f} "
+                f"!= adjust_SAT {expected_sat:.3f} / adjust_static_pressure {expected_static:.3f}"
+            )
+
+
+class _OscillationStats:
+    """Per AHU running statistics of one setpoint, after the settle period."""
+
+    def __init__(self, num_ahus):
+        self.last_direction = np.zeros(num_ahus, dtype=np.int8)
+        self.reversals = np.zeros(num_ahus, dtype=np.int64)
+        self.travel = np.zeros(num_ahus)
+        self.total = np.zeros(num_ahus)
+        self.total_sq = np.zeros(num_ahus)
+        self.at_min = np.zeros(num_ahus, dtype=np.int64)
+        self.at_max = np.zeros(num_ahus, dtype=np.int64)
+        self.requests = np.zeros(num_ahus, dtype=np.int64)
+        self.request_ticks = np.zeros(num_ahus, dtype=np.int64)
+        self.max_requests = np.zeros(num_ahus, dtype=np.int64)
+        self.ticks = 0
+
+    def update(self, old_sp, new_sp, adjustment, num_requests, sp_min, sp_max):
+        # A reversal is a T&R adjustment against the previous one, e.g. a trim
+        # right after a respond. Using the adjustment rather than the setpoint
+        # change keeps limit clamping and an OAT driven SPmax out of the count.
+        direction = np.sign(adjustment).astype(np.int8)
+        self.reversals += (self.last_direction != 0) & (direction != self.last_direction)
+        self.last_direction[:] = direction
+        self.travel += np.abs(new_sp - old_sp)
+        self.total += new_sp
+        self.total_sq += new_sp * new_sp
+        self.at_min += new_sp <= sp_min
+        self.at_max += new_sp >= sp_max
+        self.requests += num_requests
+        self.request_ticks += num_requests > 0
+        np.maximum(self.max_requests, num_requests, out=self.max_requests)
+        self.ticks += 1
+
+    def summary(self):
+        hours = self.ticks * TICK_SECONDS / 3600
+        reversals_per_hour = self.reversals / hours
+        mean = self.total / self.ticks
+        std = np.sqrt(np.maximum(self.total_sq / self.ticks - mean * mean, 0.0))
+        return {
+            "reversals_per_hour_mean": float(reversals_per_hour.mean()),
+            "reversals_per_hour_p95": float(np.percentile(reversals_per_hour, 95)),
+            "reversals_per_hour_max": float(reversals_per_hour.max()),
+            "travel_per_hour_mean": float((self.travel / hours).mean()),
+            "setpoint_mean": float(mean.mean()),
+            "setpoint_std_mean": float(std.mean()),
+            "setpoint_std_p95": float(np.percentile(std, 95)),
+            "pct_time_at_min": float(100 * self.at_min.sum() / (self.ticks * len(mean))),
+            "pct_time_at_max": float(100 * self.at_max.sum() / (self.ticks * len(mean))),
+            "requests_per_tick_mean": float(self.requests.sum() / (self.ticks * len(mean))),
+            "pct_ticks_with_requests": float(
+                100 * self.request_ticks.sum() / (self.ticks * len(mean))
+            ),
+            "requests_max": int(self.max_requests.max()),
+        }
+
+
+def run_fleet(
+    num_ahus=NUM_AHUS,
+    num_zones=NUM_ZONES,
+    hours=SIM_HOURS,
+    seed=SEED,
+    settle_hours=SETTLE_HOURS,
+    verify_ahus=0,
+):
+    """
+    Simulate the fleet and return a summary dict with "sat", "static" and
+    "zones" statistics plus throughput. The same seed gives the same run.
+    verify_ahus > 0 replays that many AHUs through adjust_SAT and
+    adjust_static_pressure every tick (slow, for checking the batch path).
+    """
+    rng = np.random.default_rng(seed)
+    shape = (num_ahus, num_zones)
+    num_ticks = int(hours * 3600 // TICK_SECONDS)
+    settle_ticks = int(settle_hours * 3600 // TICK_SECONDS)
+    if settle_ticks >= num_ticks:
+        raise ValueError("hours must be longer than settle_hours")
+
+    # Per AHU weather and per zone design load fraction
+    oat_mean = rng.uniform(*OAT_MEAN_RANGE, num_ahus)
+    oat_swing = rng.uniform(*OAT_SWING_RANGE, num_ahus)
+    oat_noise = np.zeros(num_ahus)
+    base_load = (
+        rng.uniform(*AHU_LOAD_RANGE, num_ahus)[:, None]
+        * rng.uniform(*ZONE_LOAD_RANGE, shape)
+    )
+    internal_load = np.zeros(shape)
+
+    sat = np.full(num_ahus, float(sat_rules.SP0))
+    static = np.full(num_ahus, float(sp_rules.SP0))
+    zone_temps = rng.uniform(ZONE_COOLING_SPT - 1.0, ZONE_COOLING_SPT + 1.0, shape)
+    dampers = np.full(shape, 0.5)
+
+    sat_stats = _OscillationStats(num_ahus)
+    static_stats = _OscillationStats(num_ahus)
+    hot_zone_ticks = 0
+    min_damper_ticks = 0
+    zone_error_sq = 0.0
+
+    dt_over_tau = TICK_SECONDS / ZONE_TAU
+    damper_step = DAMPER_GAIN * TICK_SECONDS / 60
+
+    start = time.perf_counter()
+    for tick in range(num_ticks):
+        with aso_metrics.timer("fleet_sim.tick"):
+            # Weather and loads
+            hour = tick * TICK_SECONDS / 3600
+            oat_noise = 0.95 * oat_noise + rng.normal(0.0, OAT_NOISE, num_ahus)
+            oat = (
+                oat_mean
+                + oat_swing * np.cos(2 * np.pi * (hour - OAT_PEAK_HOUR) / 24)
+                + oat_noise
+            )
+            internal_load *= LOAD_NOISE_DECAY
+            internal_load += rng.normal(0.0, LOAD_NOISE, shape)
+            weather_factor = np.clip((oat - 55.0) / 40.0, 0.0, 1.0)[:, None]
+            load = base_load * (
+                1.0 - LOAD_WEATHER_SHARE + LOAD_WEATHER_SHARE * weather_factor
+            )
+            load += internal_load
+            np.maximum(load, 0.0, out=load)  # Cooling only, no negative gains
+
+            # Zone response to the current SAT and static setpoints
+            flow = dampers * np.sqrt(static / DESIGN_STATIC)[:, None]
+            cooling = flow * (zone_temps - sat[:, None]) / DESIGN_DELTA_T
+            zone_temps += dt_over_tau * ZONE_LOAD_GAIN * (load - cooling)
+            dampers += damper_step * (zone_temps - ZONE_COOLING_SPT)
+            np.clip(dampers, DAMPER_MIN, 1.0, out=dampers)
+
+            # T&R for every AHU
+            new_sat, sat_adjustment, sat_requests = sat_reset_step(sat, zone_temps, oat)
+            new_static, static_adjustment, static_requests = static_reset_step(
+                static, dampers
+            )
+            if verify_ahus:
+                _verify_against_scalar_rules(
+                    sat, zone_temps, oat, new_sat, static, dampers, new_static, verify_ahus
+                )
+
+            if tick >= settle_ticks:
+                sat_stats.update(
+                    sat,
+                    new_sat,
+                    sat_adjustment,
+                    sat_requests,
+                    sat_rules.SPmin,
+                    dynamic_sat_max(oat),
+                )
+                static_stats.update(
+                    static,
+                    new_static,
+                    static_adjustment,
+                    static_requests,
+                    sp_rules.SPmin,
+                    sp_rules.SPmax,
+                )
+                hot_zone_ticks += int(
+                    np.count_nonzero(zone_temps >= sat_rules.HighZoneTempSpt)
+                )
+                min_damper_ticks += int(np.count_nonzero(dampers <= DAMPER_MIN))
+                zone_error_sq += float(np.square(zone_temps - ZONE_COOLING_SPT).sum())
+            sat, static = new_sat, new_static
+    elapsed = time.perf_counter() - start
+    aso_metrics.counter("fleet_sim.ticks", num_ticks)
+    aso_metrics.counter("fleet_sim.ahu_ticks", num_ticks * num_ahus)
+
+    zone_ticks = sat_stats.ticks * num_ahus * num_zones
+    return {
+        "ahus": num_ahus,
+        "zones_per_ahu": num_zones,
+        "simulated_hours": hours,
+        "seed": seed,
+        "sat": sat_stats.summary(),
+        "static": static_stats.summary(),
+        "zones": {
+            "pct_time_above_high_zone_temp": 100 * hot_zone_ticks / zone_ticks,
+            "rms_error_from_cooling_spt": float(np.sqrt(zone_error_sq / zone_ticks)),
+            "pct_dampers_at_min": 100 * min_damper_ticks / zone_ticks,
+        },
+        "elapsed_seconds": elapsed,
+        "ticks_per_second": num_ticks / elapsed,
+        "ahu_ticks_per_second": num_ticks * num_ahus / elapsed,
+    }
+
+
+def log_summary(summary):
+    logger.info(
+        "%s AHUs x %s zones, %s simulated hours, seed %s",
+        summary["ahus"],
+        summary["zones_per_ahu"],
+        summary["simulated_hours"],
+        summary["seed"],
+    )
+    for key, label, unit in (("sat", "SAT", "°F"), ("static", "Static", "in. WC")):
+        stats = summary[key]
+        logger.info(
+            "%s setpoint: mean %.2f %s, std %.3f (p95 %.3f), at min %.1f%%, at max %.1f%%",
+            label,
+            stats["setpoint_mean"],
+            unit,
+            stats["setpoint_std_mean"],
+            stats["setpoint_std_p95"],
+            stats["pct_time_at_min"],
+            stats["pct_time_at_max"],
+        )
+        logger.info(
+            "%s reversals per hour: mean %.1f, p95 %.1f, max %.1f, travel %.2f %s/h",
+            label,
+            stats["reversals_per_hour_mean"],
+            stats["reversals_per_hour_p95"],
+            stats["reversals_per_hour_max"],
+            stats["travel_per_hour_mean"],
+            unit,
+        )
+        logger.info(
+            "%s net requests: %.2f per tick, %.1f%% of ticks, max %s",
+            label,
+            stats["requests_per_tick_mean"],
+            stats["pct_ticks_with_requests"],
+            stats["requests_max"],
+        )
+    logger.info(
+        "Zones above %s°F: %.2f%% of the time, RMS error from %s°F: %.2f°F, "
+        "dampers at minimum: %.1f%%",
+        sat_rules.HighZoneTempSpt,
+        summary["zones"]["pct_time_above_high_zone_temp"],
+        ZONE_COOLING_SPT,
+        summary["zones"]["rms_error_from_cooling_spt"],
+        summary["zones"]["pct_dampers_at_min"],
+    )
+    logger.info(
+        "Ticks per second: %s, AHU ticks per second: %s",
+        f"{summary['ticks_per_second']:,.1f}",
+        f"{summary['ahu_ticks_per_second']:,.0f}",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AHU fleet trim and respond stress test")
+    parser.add_argument("--ahus", type=int, default=NUM_AHUS)
+    parser.add_argument("--zones", type=int, default=NUM_ZONES)
+    parser.add_argument("--hours", type=float, default=SIM_HOURS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--verify",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Check N AHUs against adjust_SAT/adjust_static_pressure every tick",
+    )
+    args = parser.parse_args()
+
+    aso_metrics.configure_logging()
+    logger.info("Starting AHU Fleet Trim and Respond Stress Test...")
+    log_summary(
+        run_fleet(args.ahus, args.zones, args.hours, args.seed, verify_ahus=args.verify)
+    )
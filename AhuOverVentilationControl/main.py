@@ -1,3 +1,13 @@
+import logging
+import os
+import sys
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
 # Define constants
 PERCENT_OA = 0.2  # Design outside air percentage (20%)
 MIN_RETURN_OA_DELTA = 10  # Minimum temperature difference between return and outside air to calculate OA fraction
@@ -21,7 +31,7 @@ def calculate_oa_fraction(mix_air_temp, out_air_temp, return_air_temp):
         return None  # Condition false equivalent in Python
 
 
-# Function to calculate and print outside air fraction and CFM
+# Function to calculate and log outside air fraction and CFM
 def calculate_ventilation(fault_data):
     for minute in range(len(fault_data["vav_total_air_flow"])):
         vav_total_air_flow = fault_data["vav_total_air_flow"][minute]
@@ -29,6 +39,7 @@ def calculate_ventilation(fault_data):
         out_air_temp = fault_data["out_air_temp"][minute]
         return_air_temp = fault_data["return_air_temp"][minute]
         fan_vfd_speed = fault_data["fan_vfd_speed_col"][minute]
+        design_oa_cfm = PERCENT_OA * vav_total_air_flow
 
         if (
             fan_vfd_speed == 0.0
@@ -43,12 +54,17 @@ def calculate_ventilation(fault_data):
             calculated_oa_cfm = (
                 oa_fraction * vav_total_air_flow if oa_fraction is not None else None
             )
-            design_oa_cfm = PERCENT_OA * vav_total_air_flow
 
-        print(
-            f"Minute {minute}: OA Fraction = {oa_fraction}, Calculated OA CFM = {calculated_oa_cfm}, Design OA CFM = {design_oa_cfm}"
+        logger.info(
+            "Minute %s: OA Fraction = %s, Calculated OA CFM = %s, Design OA CFM = %s",
+            minute,
+            oa_fraction,
+            calculated_oa_cfm,
+            design_oa_cfm,
         )
 
 
 # Run the calculation
-calculate_ventilation(fault_data)
+if __name__ == "__main__":
+    aso_metrics.configure_logging()
+    calculate_ventilation(fault_data)
@@ -0,0 +1,329 @@
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+import aso_metrics
+from main import PERCENT_OA, MIN_RETURN_OA_DELTA
+from ventilation_analytics import calculate_oa_fraction_array
+
+logger = logging.getLogger(__name__)
+
+# Configuration Parameters
+ROLLING_WINDOW = 15  # Samples in the rolling OA fraction window
+SUPPLY_FAN_MIN_RUNTIME_SEC = 30 * 60  # Fan must run 30 minutes before engaging
+ECON_MIN_POS_TOL = 0.02  # Economizer within this of the BAS MIN OA = at minimum
+OVERRIDE_ON_BAND = 0.05  # Engage when rolling OA fraction > design + this
+OVERRIDE_OFF_BAND = 0.01  # Release when back at BAS MIN OA and below design + this
+MAX_OA_FRACTION_STD = 0.05  # Too noisy to trust the OA fraction above this
+MIN_OA_STEP = 0.01  # Adjust MIN OA damper 1% ...
+MIN_OA_STEP_INTERVAL_SEC = 5 * 60  # ... every 5 minutes
+MIN_OA_DPR_FLOOR = 0.0  # Never command the MIN OA damper below this
+
+
+class OverVentilationController:
+    """
+    Streaming ASO override of the AHU MIN OA damper setpoint.
+
+    State for every AHU lives in flat NumPy arrays so one update() call
+    evaluates the whole fleet. Each AHU keeps a ring buffer of the last
+    ROLLING_WINDOW OA fractions with running sums, so the rolling mean and
+    variance are O(1) per sample.
+
+    Decision logic per AHU (see README.md):
+    - Engage when the fan has run SUPPLY_FAN_MIN_RUNTIME_SEC, the economizer
+      is at minimum, the window is full, the signal is steady and the
+      rolling OA fraction exceeds design + OVERRIDE_ON_BAND.
+    - While engaged, step the MIN OA command down MIN_OA_STEP every
+      MIN_OA_STEP_INTERVAL_SEC if above design, up if below design, never
+      above the BAS setpoint.
+    - Release back to the BAS when the command is back at the BAS setpoint
+      and the OA fraction is within design + OVERRIDE_OFF_BAND, or right
+      away when the fan stops or the RAT/OAT delta drops below
+      MIN_RETURN_OA_DELTA.
+    """
+
+    def __init__(
+        self,
+        ahu_names,
+        design_percent_oa=PERCENT_OA,
+        bas_min_oa_dpr=0.2,
+        window=ROLLING_WINDOW,
+        min_return_oa_delta=MIN_RETURN_OA_DELTA,
+    ):
+        self.ahu_names = list(ahu_names)
+        n = len(self.ahu_names)
+        self.window = window
+        self.min_return_oa_delta = min_return_oa_delta
+        self.design_percent_oa = self._per_ahu(design_percent_oa, PERCENT_OA)
+        self.bas_min_oa_dpr = self._per_ahu(bas_min_oa_dpr, 0.2)
+
+        # Rolling OA fraction state
+        self._buffer = np.zeros((n, window))
+        self._pos = np.zeros(n, dtype=np.int64)
+        self._count = np.zeros(n, dtype=np.int64)
+        self._sum = np.zeros(n)
+        self._sum_sq = np.zeros(n)
+        self._rows = np.arange(n)
+
+        # Override state
+        self.fan_on_since = np.full(n, np.nan)
+        self.override_active = np.zeros(n, dtype=bool)
+        self.min_oa_dpr_cmd = self.bas_min_oa_dpr.copy()
+        self.last_step_time = np.full(n, -np.inf)
+
+    def _per_ahu(self, value, default):
+        if isinstance(value, dict):
+            return np.array(
+                [value.get(name, default) for name in self.ahu_names], dtype=float
+            )
+        return np.full(len(self.ahu_names), value, dtype=float)
+
+    @property
+    def rolling_mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._count > 0, self._sum / self._count, np.nan)
+
+    @property
+    def rolling_var(self):
+        mean = self.rolling_mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self._sum_sq / self._count - mean * mean
+        # Running sums can dip a hair below zero from float round-off
+        return np.where(self._count > 0, np.maximum(var, 0.0), np.nan)
+
+    def _reset_window(self, mask):
+        self._buffer[mask] = 0.0
+        self._pos[mask] = 0
+        self._count[mask] = 0
+        self._sum[mask] = 0.0
+        self._sum_sq[mask] = 0.0
+
+    def _push(self, mask, oa_fraction):
+        rows = self._rows[mask]
+        pos = self._pos[rows]
+        new = oa_fraction[rows]
+        old = self._buffer[rows, pos]
+
+        self._buffer[rows, pos] = new
+        self._sum[rows] += new - old
+        self._sum_sq[rows] += new * new - old * old
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.window)
+        self._pos[rows] = (pos + 1) % self.window
+
+        # Re-sum rows that just wrapped so round-off never accumulates.
+        # Amortized over the window this stays O(1) per sample.
+        wrapped = rows[self._pos[rows] == 0]
+        if wrapped.size:
+            self._sum[wrapped] = self._buffer[wrapped].sum(axis=1)
+            self._sum_sq[wrapped] = np.square(self._buffer[wrapped]).sum(axis=1)
+
+    def update(
+        self,
+        now,
+        vav_total_air_flow,
+        mix_air_temp,
+        out_air_temp,
+        return_air_temp,
+        fan_vfd_speed,
+        economizer_sig,
+    ):
+        """
+        Feed one sample per AHU (arrays ordered like ahu_names) taken at
+        time `now` in seconds. NaN in any input means no new sample for that
+        AHU this tick; its state is left untouched.
+
+        Returns a dict of arrays: override_active, min_oa_dpr_cmd,
+        oa_fraction_mean, oa_fraction_std and calculated_oa_cfm.
+        """
+        flow = np.asarray(vav_total_air_flow, dtype=float)
+        mat = np.asarray(mix_air_temp, dtype=float)
+        oat = np.asarray(out_air_temp, dtype=float)
+        rat = np.asarray(return_air_temp, dtype=float)
+        fan_speed = np.asarray(fan_vfd_speed, dtype=float)
+        econ = np.asarray(economizer_sig, dtype=float)
+
+        has_sample = ~(
+            np.isnan(mat) | np.isnan(oat) | np.isnan(rat) | np.isnan(fan_speed)
+        )
+        oa_fraction, valid = calculate_oa_fraction_array(
+            mat, oat, rat, fan_speed, self.min_return_oa_delta
+        )
+
+        # Fan proof and runtime
+        fan_on = has_sample & (fan_speed > 0.0)
+        fan_off = has_sample & ~fan_on
+        self.fan_on_since[fan_off] = np.nan
+        self.fan_on_since[fan_on & np.isnan(self.fan_on_since)] = now
+
+        # Fan off or RAT/OAT delta too small releases control immediately
+        release_now = has_sample & ~valid
+        self._reset_window(release_now)
+        self._push(has_sample & valid, oa_fraction)
+
+        mean = self.rolling_mean
+        std = np.sqrt(self.rolling_var)
+        design = self.design_percent_oa
+
+        with np.errstate(invalid="ignore"):
+            fan_proven = (now - self.fan_on_since) >= SUPPLY_FAN_MIN_RUNTIME_SEC
+            econ_at_min = econ <= self.bas_min_oa_dpr + ECON_MIN_POS_TOL
+            steady = (self._count == self.window) & (std <= MAX_OA_FRACTION_STD)
+            over = mean > design + OVERRIDE_ON_BAND
+            under = mean < design
+            back_to_design = mean <= design + OVERRIDE_OFF_BAND
+
+        engage = (
+            has_sample & ~self.override_active & fan_proven & econ_at_min & steady & over
+        )
+        self.override_active |= engage
+
+        # Step the MIN OA command on the 5 minute cadence
+        due = (
+            has_sample
+            & self.override_active
+            & steady
+            & ((now - self.last_step_time) >= MIN_OA_STEP_INTERVAL_SEC)
+        )
+        step_down = due & (mean > design)
+        step_up = due & under
+        self.min_oa_dpr_cmd[step_down] -= MIN_OA_STEP
+        self.min_oa_dpr_cmd[step_up] += MIN_OA_STEP
+        np.clip(
+            self.min_oa_dpr_cmd,
+            MIN_OA_DPR_FLOOR,
+            self.bas_min_oa_dpr,
+            out=self.min_oa_dpr_cmd,
+        )
+        self.last_step_time[step_down | step_up] = now
+
+        # Hysteresis release once back at the BAS setpoint near design
+        at_bas = self.min_oa_dpr_cmd >= self.bas_min_oa_dpr
+        release = release_now | (
+            has_sample & self.override_active & at_bas & back_to_design & ~step_down
+        )
+        self.override_active[release] = False
+        self.min_oa_dpr_cmd[release] = self.bas_min_oa_dpr[release]
+        self.last_step_time[release] = -np.inf
+
+        return {
+            "override_active": self.override_active.copy(),
+            "min_oa_dpr_cmd": self.min_oa_dpr_cmd.copy(),
+            "oa_fraction_mean": mean,
+            "oa_fraction_std": std,
+            "calculated_oa_cfm": oa_fraction * flow,
+        }
+
+
+def generate_synthetic_trends(num_ahus, num_ticks, tick_sec=60, seed=0):
+    """
+    Synthetic minute trends for replaying the controller. Every AHU runs a
+    cold morning with the fan starting at tick 0. The first half of the
+    AHUs leak extra outside air (e.g. a stuck relief damper) so they
+    over-ventilate at the BAS MIN OA position; the rest sit at design OA.
+    Each tick is one row of arrays in AHU order.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (num_ticks, num_ahus)
+
+    oa_leakage = np.zeros(num_ahus)
+    oa_leakage[: num_ahus // 2] = 0.15
+
+    return {
+        "time": np.arange(num_ticks) * float(tick_sec),
+        "vav_total_air_flow": 10000.0 + rng.normal(0.0, 50.0, shape),
+        "out_air_temp": 10.0 + rng.normal(0.0, 0.5, shape),
+        "return_air_temp": 72.0 + rng.normal(0.0, 0.3, shape),
+        "oa_fraction_noise": rng.normal(0.0, 0.01, shape),
+        "oa_leakage": oa_leakage,
+        "fan_vfd_speed": np.full(shape, 0.66),
+    }
+
+
+def replay(controller, trends):
+    """
+    Closed-loop replay of synthetic trends through the controller. The
+    AHU's true OA fraction is its MIN OA damper command plus leakage, so
+    the mixed air temperature responds to each override decision.
+    Returns the per-tick override flags and MIN OA commands as
+    (ticks, ahus) arrays.
+    """
+    num_ticks = len(trends["time"])
+    active = np.zeros((num_ticks, len(controller.ahu_names)), dtype=bool)
+    cmd = np.zeros(active.shape)
+    for tick, now in enumerate(trends["time"]):
+        oat = trends["out_air_temp"][tick]
+        rat = trends["return_air_temp"][tick]
+        oa_fraction = (
+            controller.min_oa_dpr_cmd
+            + trends["oa_leakage"]
+            + trends["oa_fraction_noise"][tick]
+        )
+        decision = controller.update(
+            now,
+            trends["vav_total_air_flow"][tick],
+            rat - oa_fraction * (rat - oat),
+            oat,
+            rat,
+            trends["fan_vfd_speed"][tick],
+            controller.min_oa_dpr_cmd,
+        )
+        active[tick] = decision["override_active"]
+        cmd[tick] = decision["min_oa_dpr_cmd"]
+    return active, cmd
+
+
+if __name__ == "__main__":
+    NUM_AHUS = 5000
+    NUM_TICKS = 240  # Four hours of minute data
+
+    aso_metrics.configure_logging()
+    logger.info("Replaying %s ticks of synthetic trends for %s AHUs...", NUM_TICKS, NUM_AHUS)
+    trends = generate_synthetic_trends(NUM_AHUS, NUM_TICKS)
+    controller = OverVentilationController(
+        [f"AHU-{i}" for i in range(NUM_AHUS)],
+        design_percent_oa=PERCENT_OA,
+        bas_min_oa_dpr=0.2,
+    )
+
+    start = time.perf_counter()
+    active, cmd = replay(controller, trends)
+    elapsed = time.perf_counter() - start
+
+    over_ventilating = np.arange(NUM_AHUS) < NUM_AHUS // 2
+    first_engaged = active.argmax(axis=0)
+    logger.info(
+        "Over-ventilating AHUs overridden: %.0f%%", 100 * active[-1][over_ventilating].mean()
+    )
+    logger.info(
+        "Near-design AHUs overridden: %.0f%%",
+        100 * active[:, ~over_ventilating].any(axis=0).mean(),
+    )
+    logger.info(
+        "First override after %s minutes of fan runtime",
+        first_engaged[over_ventilating].min(),
+    )
+    logger.info(
+        "Final mean MIN OA command (over-ventilating): %.2f",
+        cmd[-1][over_ventilating].mean(),
+    )
+    logger.info("AHU samples per second: %s", f"{NUM_AHUS * NUM_TICKS / elapsed:,.0f}")
+
+    # Replay checks: every over-ventilating AHU ends up overridden with a
+    # lower MIN OA command, and no near-design AHU is ever overridden
+    failures = []
+    if not active[-1][over_ventilating].all():
+        failures.append("not every over-ventilating AHU is overridden at the end")
+    if not (cmd[-1][over_ventilating] < controller.bas_min_oa_dpr[over_ventilating]).all():
+        failures.append("an overridden AHU did not lower its MIN OA command")
+    if active[:, ~over_ventilating].any():
+        failures.append("a near-design AHU was overridden")
+    for failure in failures:
+        logger.error("FAIL: %s", failure)
+    if failures:
+        sys.exit(1)
+    logger.info("Replay checks passed")
@@ -0,0 +1,203 @@
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+import aso_metrics
+from main import PERCENT_OA, MIN_RETURN_OA_DELTA
+
+logger = logging.getLogger(__name__)
+
+OA_FRACTION_ERR_THRES = 0.05  # Allowed OA fraction above design before flagging
+AHU_COL = "ahu"
+
+REQUIRED_COLUMNS = [
+    "vav_total_air_flow",
+    "mix_air_temp",
+    "out_air_temp",
+    "return_air_temp",
+    "fan_vfd_speed_col",
+]
+
+
+def calculate_oa_fraction_array(
+    mat, oat, rat, fan_speed, min_return_oa_delta=MIN_RETURN_OA_DELTA
+):
+    """
+    Array version of calculate_oa_fraction in main.py.
+    Returns (oa_fraction, valid) where invalid samples (fan off or
+    return/outside air delta too small) are NaN in oa_fraction.
+    """
+    rat_oat_delta = rat - oat
+    valid = (fan_speed != 0.0) & (np.abs(rat_oat_delta) >= min_return_oa_delta)
+
+    oa_fraction = np.full(np.shape(rat_oat_delta), np.nan)
+    np.divide(rat - mat, rat_oat_delta, out=oa_fraction, where=valid)
+    return oa_fraction, valid
+
+
+def calculate_ventilation_frame(
+    data,
+    percent_oa=PERCENT_OA,
+    min_return_oa_delta=MIN_RETURN_OA_DELTA,
+    oa_fraction_err_thres=OA_FRACTION_ERR_THRES,
+):
+    """
+    Columnar version of calculate_ventilation in main.py.
+    Adds oa_fraction, calculated_oa_cfm, design_oa_cfm and over_ventilation
+    columns to a copy of the trend frame. Rows where the fan is off or the
+    return/outside air delta is too small get NaN for the OA calcs and are
+    never flagged. percent_oa can be a scalar or a per-row array.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in data.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    result = data.copy()
+    total_flow = result["vav_total_air_flow"].to_numpy(dtype=float)
+    mat = result["mix_air_temp"].to_numpy(dtype=float)
+    oat = result["out_air_temp"].to_numpy(dtype=float)
+    rat = result["return_air_temp"].to_numpy(dtype=float)
+    fan_speed = result["fan_vfd_speed_col"].to_numpy(dtype=float)
+    percent_oa = np.broadcast_to(np.asarray(percent_oa, dtype=float), total_flow.shape)
+
+    oa_fraction, valid = calculate_oa_fraction_array(
+        mat, oat, rat, fan_speed, min_return_oa_delta
+    )
+
+    result["oa_fraction"] = oa_fraction
+    result["calculated_oa_cfm"] = oa_fraction * total_flow
+    result["design_oa_cfm"] = percent_oa * total_flow
+    result["over_ventilation"] = valid & (
+        oa_fraction > percent_oa + oa_fraction_err_thres
+    )
+    return result
+
+
+def _stack_ahu_frames(ahu_data):
+    """
+    Accept either {ahu_name: trend_frame} or one long frame with an "ahu"
+    column and return a single long frame grouped by AHU. Rows keep their
+    original (time) order within each AHU.
+    """
+    if isinstance(ahu_data, pd.DataFrame):
+        if AHU_COL not in ahu_data.columns:
+            raise ValueError(f"Batch frame needs an '{AHU_COL}' column")
+        stacked = ahu_data
+    else:
+        stacked = pd.concat(
+            {name: frame for name, frame in ahu_data.items()},
+            names=[AHU_COL],
+        ).reset_index(level=0)
+    return stacked.sort_values(AHU_COL, kind="stable")
+
+
+def calculate_ventilation_batch(
+    ahu_data,
+    design_percent_oa=PERCENT_OA,
+    min_return_oa_delta=MIN_RETURN_OA_DELTA,
+    oa_fraction_err_thres=OA_FRACTION_ERR_THRES,
+):
+    """
+    Run the over-ventilation rule over many AHUs in one pass.
+    design_percent_oa is either a scalar or a {ahu_name: fraction} mapping
+    taken from the mechanical schedules; AHUs missing from the mapping
+    fall back to PERCENT_OA.
+    """
+    stacked = _stack_ahu_frames(ahu_data)
+
+    if isinstance(design_percent_oa, dict):
+        percent_oa = (
+            stacked[AHU_COL].map(design_percent_oa).fillna(PERCENT_OA).to_numpy(float)
+        )
+    else:
+        percent_oa = design_percent_oa
+
+    return calculate_ventilation_frame(
+        stacked, percent_oa, min_return_oa_delta, oa_fraction_err_thres
+    )
+
+
+def summarize_fault_events(results):
+    """
+    Collapse consecutive over_ventilation rows into one event per run.
+    Expects the output of calculate_ventilation_batch (or a single-AHU
+    frame from calculate_ventilation_frame, reported under AHU "ahu").
+    """
+    if AHU_COL in results.columns:
+        ahu = results[AHU_COL].to_numpy()
+    else:
+        ahu = np.full(len(results), AHU_COL, dtype=object)
+    flag = results["over_ventilation"].to_numpy(dtype=bool)
+
+    # A new run starts whenever the flag or the AHU changes
+    new_run = np.ones(len(results), dtype=bool)
+    new_run[1:] = (flag[1:] != flag[:-1]) | (ahu[1:] != ahu[:-1])
+    run_id = np.cumsum(new_run)
+
+    flagged = results[flag]
+    if flagged.empty:
+        return pd.DataFrame(
+            columns=[
+                AHU_COL,
+                "start",
+                "end",
+                "samples",
+                "mean_oa_fraction",
+                "max_oa_fraction",
+                "mean_excess_oa_cfm",
+            ]
+        )
+
+    events = pd.DataFrame(
+        {
+            AHU_COL: ahu[flag],
+            "timestamp": flagged.index,
+            "oa_fraction": flagged["oa_fraction"].to_numpy(),
+            "excess_oa_cfm": (
+                flagged["calculated_oa_cfm"] - flagged["design_oa_cfm"]
+            ).to_numpy(),
+            "run_id": run_id[flag],
+        }
+    )
+    return (
+        events.groupby("run_id", sort=True)
+        .agg(
+            ahu=(AHU_COL, "first"),
+            start=("timestamp", "first"),
+            end=("timestamp", "last"),
+            samples=("oa_fraction", "size"),
+            mean_oa_fraction=("oa_fraction", "mean"),
+            max_oa_fraction=("oa_fraction", "max"),
+            mean_excess_oa_cfm=("excess_oa_cfm", "mean"),
+        )
+        .reset_index(drop=True)
+    )
+
+
+if __name__ == "__main__":
+    from main import fault_data
+
+    aso_metrics.configure_logging()
+    trend = pd.DataFrame(
+        fault_data,
+        index=pd.date_range("2024-01-15 06:00", periods=6, freq="1min"),
+    )
+    trend.index.name = "timestamp"
+
+    # Second AHU is near design OA except for a two minute excursion
+    ahu_2 = trend.assign(mix_air_temp=[60.0, 60.2, 45.0, 44.8, 60.1, 60.3])
+
+    batch = calculate_ventilation_batch(
+        {"AHU-1": trend, "AHU-2": ahu_2},
+        design_percent_oa={"AHU-1": 0.3, "AHU-2": 0.2},
+    )
+    logger.info(
+        "%s",
+        batch[[AHU_COL, "oa_fraction", "calculated_oa_cfm", "design_oa_cfm", "over_ventilation"]],
+    )
+    logger.info("%s", summarize_fault_events(batch))
@@ -1,6 +1,17 @@
+import logging
+import os
+import sys
 import time
 import random
 
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "TrimAndRespond"))
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+from trim_respond import threshold_requests, net_requests, trim_respond
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
 # Configuration Parameters
 SP0 = 0.5  # Initial static pressure setpoint in inches WC
 SPmin = 0.50  # Minimum allowable static pressure
@@ -21,22 +32,25 @@ device_on = False
 
 def calculate_requests(vav_dampers):
     """Calculate requests based on VAV damper positions being greater than or equal to HighDamperSpt."""
-    sorted_dampers = sorted(vav_dampers, reverse=True)  # Sort descending
-    ignored_dampers = sorted_dampers[:I]  # Top I dampers
-    remaining_dampers = sorted_dampers[I:]  # Dampers after ignoring top I
-    max_remaining_damper = max(remaining_dampers) if remaining_dampers else None
-
-    num_requests = sum(1 for pos in remaining_dampers if pos >= HighDamperSpt)
-
-    # Print results
-    print(f"Ignored Damper Positions: {ignored_dampers}")
-    if max_remaining_damper is not None:
-        print(
-            f"Max Damper Position (After Excluding Top {I}): {max_remaining_damper:.2f}"
-        )
-    else:
-        print(f"No remaining dampers to evaluate after excluding the top {I}.")
-    print(f"Net Requests (Factoring Ignored Dampers): {num_requests}")
+    num_requests = int(net_requests(threshold_requests(vav_dampers, HighDamperSpt), I))
+    aso_metrics.counter("static_pressure_reset.dampers_evaluated", len(vav_dampers))
+    aso_metrics.counter("static_pressure_reset.requests", num_requests)
+
+    # Sorting is only needed for the debug detail
+    if logger.isEnabledFor(logging.DEBUG):
+        sorted_dampers = sorted(vav_dampers, reverse=True)  # Sort descending
+        ignored_dampers = sorted_dampers[:I]  # Top I dampers
+        remaining_dampers = sorted_dampers[I:]  # Dampers after ignoring top I
+        logger.debug("Ignored Damper Positions: %s", ignored_dampers)
+        if remaining_dampers:
+            logger.debug(
+                "Max Damper Position (After Excluding Top %s): %.2f",
+                I,
+                max(remaining_dampers),
+            )
+        else:
+            logger.debug("No remaining dampers to evaluate after excluding the top %s.", I)
+    logger.debug("Net Requests (Factoring Ignored Dampers): %s", num_requests)
 
     return num_requests
 
@@ -47,58 +61,56 @@ def adjust_static_pressure(current_pressure, num_requests):
     Trim if no requests, respond if requests exist.
     Limit adjustment to SPres_max.
     """
-    total_adjustment = 0
-    if num_requests == 0:
-        # Calculate trim adjustment
-        total_adjustment = SPtrim
-    else:
-        # Calculate response adjustment proportional to number of requests
-        total_adjustment = SPres * num_requests
-
-    # Cap the adjustment to SPres_max
-    if total_adjustment > 0:
-        total_adjustment = min(total_adjustment, SPres_max)
-    elif total_adjustment < 0:
-        total_adjustment = max(total_adjustment, -SPres_max)
+    new_pressure, total_adjustment = trim_respond(
+        current_pressure, num_requests, SPtrim, SPres, SPres_max, SPmin, SPmax
+    )
+    total_adjustment = float(total_adjustment)
 
-    print(f"Total Adjustment is {total_adjustment} Inch WC")
+    logger.debug("Total Adjustment is %s Inch WC", total_adjustment)
 
-    # Update the current pressure with capped adjustment
-    current_pressure = max(SPmin, min(SPmax, current_pressure + total_adjustment))
+    current_pressure = float(new_pressure)
 
     adjustment_type = "increased" if total_adjustment > 0 else "decreased"
-    print(f"We need {'more' if total_adjustment > 0 else 'less'} static!...")
+    logger.debug("We need %s static!...", "more" if total_adjustment > 0 else "less")
     return current_pressure, total_adjustment, adjustment_type
 
 
 # Simulation
-print("Starting AHU Static Pressure Simulation...")
-print(f"Ignore Var Set to {I} for the simulation...")
-
-time.sleep(Td)  # Initial delay
-device_on = True
-
-try:
-    while device_on:
-        # Generate exactly NUM_DAMPERS damper positions
-        vav_dampers = [round(random.uniform(0.3, 0.95), 2) for _ in range(NUM_DAMPERS)]
-
-        # Calculate the number of requests
-        num_requests = calculate_requests(vav_dampers)
-
-        # Adjust static pressure and determine adjustment type
-        previous_pressure = current_static_pressure
-        current_static_pressure, adjustment, adjustment_type = adjust_static_pressure(
-            current_static_pressure, num_requests
-        )
-
-        # Print the results for this time step
-        print(f"Previous Static Pressure Setpoint: {previous_pressure:.2f}” WC")
-        print(
-            f"Current Static Pressure Setpoint: {current_static_pressure:.2f}” WC ({adjustment_type})\n"
-        )
-
-        # Wait for the next time step
-        time.sleep(T)
-except KeyboardInterrupt:
-    print("Simulation stopped.")
+if __name__ == "__main__":
+    aso_metrics.configure_logging()
+    logger.info("Starting AHU Static Pressure Simulation...")
+    logger.info("Ignore Var Set to %s for the simulation...", I)
+
+    time.sleep(Td)  # Initial delay
+    device_on = True
+
+    try:
+        while device_on:
+            with aso_metrics.timer("static_pressure_reset.tick"):
+                # Generate exactly NUM_DAMPERS damper positions
+                vav_dampers = [
+                    round(random.uniform(0.3, 0.95), 2) for _ in range(NUM_DAMPERS)
+                ]
+
+                # Calculate the number of requests
+                num_requests = calculate_requests(vav_dampers)
+
+                # Adjust static pressure and determine adjustment type
+                previous_pressure = current_static_pressure
+                current_static_pressure, adjustment, adjustment_type = (
+                    adjust_static_pressure(current_static_pressure, num_requests)
+                )
+            aso_metrics.counter("static_pressure_reset.ticks")
+
+            # Log the results for this time step
+            logger.debug("Previous Static Pressure Setpoint: %.2f” WC", previous_pressure)
+            logger.info(
+                "Current Static Pressure Setpoint: %.2f” WC (%s)",
+                current_static_pressure,
+                adjustment_type,
+            )
+
+            # Wait for the next time step
+            time.sleep(T)
+    except KeyboardInterrupt:
+        logger.info("Simulation stopped.")
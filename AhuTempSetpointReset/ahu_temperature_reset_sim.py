@@ -1,6 +1,17 @@
+import logging
+import os
+import sys
 import time
 import random
 
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "TrimAndRespond"))
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+from trim_respond import threshold_requests, net_requests, trim_respond
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
 # Configuration Parameters
 SP0 = 60  # Initial SAT setpoint in °F
 SPmin = 55  # Minimum SAT setpoint in °F
@@ -43,26 +54,32 @@ def calculate_dynamic_SPmax(OAT):
 def calculate_requests(zone_temps):
     """
     Calculate requests based on zone temperatures being greater than or equal to HighZoneTempSpt.
-    Also, print the ignored zone temperatures (top I) and the max zone temperature after excluding the top I.
+    At DEBUG level, also log the ignored zone temperatures (top I) and the max zone temperature after excluding the top I.
     """
-    sorted_temps = sorted(zone_temps, reverse=True)  # Sort descending
-    ignored_temps = sorted_temps[:I]  # Top I temperatures
-    remaining_temps = sorted_temps[I:]  # Temperatures after ignoring top I
-    max_remaining_temp = max(remaining_temps) if remaining_temps else None
-
-    num_requests = sum(1 for temp in remaining_temps if temp >= HighZoneTempSpt)
-
-    # Print results
-    print(
-        f"Ignored Zone Temperatures: {', '.join(f'{temp:.2f}' for temp in ignored_temps)}"
+    num_requests = int(
+        net_requests(threshold_requests(zone_temps, HighZoneTempSpt), I)
     )
-    if max_remaining_temp is not None:
-        print(
-            f"Max Zone Temperature (After Excluding Top {I}): {max_remaining_temp:.2f}°F"
+    aso_metrics.counter("sat_reset.zones_evaluated", len(zone_temps))
+    aso_metrics.counter("sat_reset.requests", num_requests)
+
+    # Sorting is only needed for the debug detail
+    if logger.isEnabledFor(logging.DEBUG):
+        sorted_temps = sorted(zone_temps, reverse=True)  # Sort descending
+        ignored_temps = sorted_temps[:I]  # Top I temperatures
+        remaining_temps = sorted_temps[I:]  # Temperatures after ignoring top I
+        logger.debug(
+            "Ignored Zone Temperatures: %s",
+            ", ".join(f"{temp:.2f}" for temp in ignored_temps),
         )
-    else:
-        print(f"No remaining zones to evaluate after excluding the top {I}.")
-    print(f"Net Requests (Factoring Ignored Zones): {num_requests}")
+        if remaining_temps:
+            logger.debug(
+                "Max Zone Temperature (After Excluding Top %s): %.2f°F",
+                I,
+                max(remaining_temps),
+            )
+        else:
+            logger.debug("No remaining zones to evaluate after excluding the top %s.", I)
+    logger.debug("Net Requests (Factoring Ignored Zones): %s", num_requests)
 
     return num_requests
 
@@ -73,59 +90,53 @@ def adjust_SAT(current_SAT, num_requests, dynamic_SPmax):
     Trim if no requests, respond if requests exist.
     Limit adjustment to SPres_max.
     """
-    total_adjustment = 0
-    if num_requests == 0:
-        # Trim SAT
-        total_adjustment = SPtrim
-    else:
-        # Respond by decreasing SAT
-        total_adjustment = SPres * num_requests
-
-    # Cap the adjustment to SPres_max
-    if total_adjustment > 0:
-        total_adjustment = min(total_adjustment, SPres_max)
-    elif total_adjustment < 0:
-        total_adjustment = max(total_adjustment, -SPres_max)
+    new_SAT, total_adjustment = trim_respond(
+        current_SAT, num_requests, SPtrim, SPres, SPres_max, SPmin, dynamic_SPmax
+    )
+    total_adjustment = float(total_adjustment)
 
-    print(f"Total Adjustment is {total_adjustment:.2f}°F")
+    logger.debug("Total Adjustment is %.2f°F", total_adjustment)
 
-    # Update the current SAT with capped adjustment
-    current_SAT = max(SPmin, min(dynamic_SPmax, current_SAT + total_adjustment))
+    current_SAT = float(new_SAT)
 
     adjustment_type = "increased" if total_adjustment > 0 else "decreased"
-    print(f"We need {'less' if total_adjustment > 0 else 'more'} cooling!...")
+    logger.debug("We need %s cooling!...", "less" if total_adjustment > 0 else "more")
 
     return current_SAT, total_adjustment, adjustment_type
 
 
 # Simulation
-print("Starting AHU Temperature Reset Simulation...")
-print(f"High Zone Temperature Threshold: {HighZoneTempSpt}°F")
-print(f"Ignore Var Set to {I} for the simulation...")
-time.sleep(Td)  # Wait for delay timer
-
-device_on = True
-while device_on:
-    # Simulate a fluctuating outside air temperature
-    current_OAT = random.uniform(55, 75)
-    dynamic_SPmax = calculate_dynamic_SPmax(current_OAT)  # Adjust SPmax based on OAT
-
-    # Simulate zone temperatures
-    # zone_temps can be a fixed number to simulate increase and decrese logic
-    zone_temps = [random.uniform(65, 80) for _ in range(NUM_ZONES)]
-    num_requests = calculate_requests(zone_temps)
-
-    # Adjust SAT based on cooling requests
-    previous_SAT = current_SAT
-    current_SAT, adjustment, adjustment_type = adjust_SAT(
-        current_SAT, num_requests, dynamic_SPmax
-    )
-
-    # Print the results for this time step
-    print(f"Current OAT: {current_OAT:.2f}°F")
-    print(f"Dynamic SPmax: {dynamic_SPmax:.2f}°F")
-    print(f"Previous SAT Setpoint: {previous_SAT:.2f}°F")
-    print(f"Current SAT Setpoint: {current_SAT:.2f}°F ({adjustment_type})\n")
-
-    # Sleep for the time step
-    time.sleep(T)
+if __name__ == "__main__":
+    aso_metrics.configure_logging()
+    logger.info("Starting AHU Temperature Reset Simulation...")
+    logger.info("High Zone Temperature Threshold: %s°F", HighZoneTempSpt)
+    logger.info("Ignore Var Set to %s for the simulation...", I)
+    time.sleep(Td)  # Wait for delay timer
+
+    device_on = True
+    while device_on:
+        with aso_metrics.timer("sat_reset.tick"):
+            # Simulate a fluctuating outside air temperature
+            current_OAT = random.uniform(55, 75)
+            dynamic_SPmax = calculate_dynamic_SPmax(current_OAT)  # Adjust SPmax based on OAT
+
+            # Simulate zone temperatures
+            # zone_temps can be a fixed number to simulate increase and decrese logic
+            zone_temps = [random.uniform(65, 80) for _ in range(NUM_ZONES)]
+            num_requests = calculate_requests(zone_temps)
+
+            # Adjust SAT based on cooling requests
+            previous_SAT = current_SAT
+            current_SAT, adjustment, adjustment_type = adjust_SAT(
+                current_SAT, num_requests, dynamic_SPmax
+            )
+        aso_metrics.counter("sat_reset.ticks")
+
+        # Log the results for this time step
+        logger.debug("Current OAT: %.2f°F", current_OAT)
+        logger.debug("Dynamic SPmax: %.2f°F", dynamic_SPmax)
+        logger.debug("Previous SAT Setpoint: %.2f°F", previous_SAT)
+        logger.info("Current SAT Setpoint: %.2f°F (%s)", current_SAT, adjustment_type)
+
+        # Sleep for the time step
+        time.sleep(T)
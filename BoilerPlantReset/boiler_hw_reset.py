@@ -0,0 +1,173 @@
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "TrimAndRespond"))
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+from trim_respond import net_requests, trim_respond
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration Parameters (G36 hot water plant reset defaults)
+SP0 = 180  # Initial hot water supply temperature setpoint in °F
+SPmin = 110  # Minimum HWS setpoint in °F
+SPmax = 180  # Maximum HWS setpoint in °F
+Td = 10 * 60  # Delay timer in seconds after the plant proves on
+T = 5 * 60  # Time step in seconds
+I = 2  # Number of ignored requests per plant
+SPtrim = -2.0  # Trim adjustment in °F
+SPres = +3.0  # Response adjustment in °F per request
+SPres_max = +7.0  # Maximum allowable response adjustment in °F
+
+# Heating hot water request thresholds (per AHU heating coil or reheat zone)
+HighValveSpt = 0.95  # Valve position that starts a request
+LowValveSpt = 0.85  # Valve position that clears a valve request
+ShortfallTwoRequests = 8.0  # °F below discharge air setpoint for 2 requests
+ShortfallThreeRequests = 17.0  # °F below discharge air setpoint for 3 requests
+ShortfallPersistence = 5 * 60  # Seconds a shortfall must persist
+
+
+class HotWaterReset:
+    """
+    Request based T&R of the HWS setpoint for many boiler plants at once.
+
+    Every heating request source (AHU heating coil or reheat zone) in the
+    building is one entry in flat arrays, mapped to its plant by plant_idx.
+    update() counts the requests of every source and applies the shared
+    trim_respond() core to every plant in one batch call per tick.
+    """
+
+    def __init__(self, plant_idx, num_plants=None):
+        self.plant_idx = np.asarray(plant_idx, dtype=np.int64)
+        self.num_plants = (
+            int(self.plant_idx.max()) + 1 if num_plants is None else num_plants
+        )
+        num_sources = len(self.plant_idx)
+
+        self.setpoint = np.full(self.num_plants, float(SP0))
+        self.plant_on_time = np.zeros(self.num_plants)
+
+        # Per source request state. Shortfall timers count the time since the
+        # shortfall was first seen, so it must be seen again a full
+        # ShortfallPersistence later to raise requests.
+        self.valve_request = np.zeros(num_sources, dtype=bool)
+        self.shortfall_2 = np.zeros(num_sources, dtype=bool)
+        self.shortfall_3 = np.zeros(num_sources, dtype=bool)
+        self.shortfall_2_time = np.zeros(num_sources)
+        self.shortfall_3_time = np.zeros(num_sources)
+
+    def calculate_heating_requests(self, valve_pos, dat_shortfall, dt=T):
+        """
+        Heating hot water requests per source:
+        - 3 requests when the discharge air is ShortfallThreeRequests °F
+          below setpoint for ShortfallPersistence seconds,
+        - else 2 requests for ShortfallTwoRequests °F,
+        - else 1 request while the valve is above HighValveSpt, held until it
+          drops below LowValveSpt,
+        - else 0.
+        """
+        valve_pos = np.asarray(valve_pos, dtype=float)
+        dat_shortfall = np.asarray(dat_shortfall, dtype=float)
+
+        shortfall_2 = dat_shortfall >= ShortfallTwoRequests
+        shortfall_3 = dat_shortfall >= ShortfallThreeRequests
+        self.shortfall_2_time = np.where(
+            shortfall_2 & self.shortfall_2, self.shortfall_2_time + dt, 0.0
+        )
+        self.shortfall_3_time = np.where(
+            shortfall_3 & self.shortfall_3, self.shortfall_3_time + dt, 0.0
+        )
+        self.shortfall_2 = shortfall_2
+        self.shortfall_3 = shortfall_3
+        self.valve_request = (valve_pos > HighValveSpt) | (
+            self.valve_request & (valve_pos >= LowValveSpt)
+        )
+
+        requests = self.valve_request.astype(np.int64)
+        requests[self.shortfall_2_time >= ShortfallPersistence] = 2
+        requests[self.shortfall_3_time >= ShortfallPersistence] = 3
+        return requests
+
+    @aso_metrics.timed("boiler_hw_reset.tick")
+    def update(self, valve_pos, dat_shortfall, plant_on=True, dt=T):
+        """
+        Run one T&R tick for every plant. Plants that are off, or still
+        inside the Td delay, are held at SP0.
+        Returns (setpoint, adjustment, net_requests) arrays per plant.
+        """
+        plant_on = np.broadcast_to(
+            np.asarray(plant_on, dtype=bool), self.setpoint.shape
+        )
+        self.plant_on_time = np.where(plant_on, self.plant_on_time + dt, 0.0)
+
+        requests = self.calculate_heating_requests(valve_pos, dat_shortfall, dt)
+        plant_requests = net_requests(requests, I, self.plant_idx, self.num_plants)
+        if aso_metrics.is_enabled():
+            aso_metrics.counter("boiler_hw_reset.ticks")
+            aso_metrics.counter("boiler_hw_reset.sources_evaluated", len(requests))
+            aso_metrics.counter("boiler_hw_reset.requests", int(requests.sum()))
+
+        new_setpoint, adjustment = trim_respond(
+            self.setpoint, plant_requests, SPtrim, SPres, SPres_max, SPmin, SPmax
+        )
+        active = self.plant_on_time >= Td
+        self.setpoint = np.where(active, new_setpoint, float(SP0))
+        adjustment = np.where(active, adjustment, 0.0)
+        return self.setpoint, adjustment, plant_requests
+
+
+def simulate_heating_load(setpoint, plant_idx, design_load):
+    """
+    Simple building response for the simulation. Each source needs a valve
+    position proportional to its load and inversely proportional to the
+    HWS to space temperature difference (70°F space). When the valve would
+    need to exceed 100% the discharge air falls short of its setpoint.
+    """
+    available = (setpoint[plant_idx] - 70.0) / (SPmax - 70.0)
+    valve_needed = design_load / available
+    valve_pos = np.clip(valve_needed, 0.0, 1.0)
+    dat_shortfall = np.maximum(valve_needed - 1.0, 0.0) * 30.0
+    return valve_pos, dat_shortfall
+
+
+if __name__ == "__main__":
+    NUM_PLANTS = 1000
+    SIM_HOURS = 24
+    rng = np.random.default_rng(0)
+
+    # Each plant serves 5 to 80 AHUs / reheat zones
+    sources_per_plant = rng.integers(5, 81, NUM_PLANTS)
+    plant_idx = np.repeat(np.arange(NUM_PLANTS), sources_per_plant)
+    plant_load = rng.uniform(0.2, 0.7, NUM_PLANTS)  # Mild to cold day per plant
+    design_load = plant_load[plant_idx] * rng.uniform(0.6, 1.2, len(plant_idx))
+
+    aso_metrics.configure_logging()
+    logger.info("Starting Boiler Plant HWS Reset Simulation...")
+    logger.info("%s plants, %s heating request sources", NUM_PLANTS, len(plant_idx))
+
+    reset = HotWaterReset(plant_idx, NUM_PLANTS)
+    num_ticks = SIM_HOURS * 3600 // T
+    start = time.perf_counter()
+    for _ in range(num_ticks):
+        valve_pos, dat_shortfall = simulate_heating_load(
+            reset.setpoint, plant_idx, design_load
+        )
+        setpoint, adjustment, plant_requests = reset.update(valve_pos, dat_shortfall)
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        "Final HWS setpoint range: %.1f°F to %.1f°F", setpoint.min(), setpoint.max()
+    )
+    logger.info(
+        "Plants still responding to requests: %.0f%%", 100 * (plant_requests > 0).mean()
+    )
+    logger.info("Ticks per second (all plants): %s", f"{num_ticks / elapsed:,.0f}")
+    logger.info(
+        "Request sources per second: %s",
+        f"{num_ticks * len(plant_idx) / elapsed:,.0f}",
+    )
@@ -0,0 +1,230 @@
+"""
+Lightweight counters, timers and latency histograms for the ASO scripts.
+
+Collection is off by default. While off, counter() and observe() return
+after one flag check and timer() hands back a shared no-op context, so
+instrumented hot paths cost next to nothing. Turn it on with enable(), or
+set the ASO_METRICS_FILE environment variable to a .json or .prom path to
+collect for the whole run and export on exit.
+
+Logging for the scripts is configured with configure_logging(), which
+reads the level from ASO_LOG_LEVEL (default INFO).
+"""
+
+import atexit
+import bisect
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from functools import wraps
+
+METRICS_FILE_ENV = "ASO_METRICS_FILE"
+LOG_LEVEL_ENV = "ASO_LOG_LEVEL"
+PROMETHEUS_PREFIX = "aso_"
+
+# Latency histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    float("inf"),
+)
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Registry:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+
+_registry = _Registry()
+
+
+def enable():
+    _registry.enabled = True
+
+
+def disable():
+    _registry.enabled = False
+
+
+def is_enabled():
+    return _registry.enabled
+
+
+def reset():
+    """Drop every collected counter and histogram."""
+    _registry.counters.clear()
+    _registry.histograms.clear()
+
+
+def counter(name, value=1):
+    """Add value to a counter, e.g. rows processed or requests counted."""
+    if not _registry.enabled:
+        return
+    _registry.counters[name] = _registry.counters.get(name, 0) + value
+
+
+def observe(name, seconds, buckets=DEFAULT_BUCKETS):
+    """Record one latency sample in seconds."""
+    if not _registry.enabled:
+        return
+    histogram = _registry.histograms.get(name)
+    if histogram is None:
+        histogram = _registry.histograms[name] = _Histogram(buckets)
+    histogram.observe(seconds)
+
+
+def timer(name):
+    """Context manager timing a pipeline stage or control tick."""
+    if not _registry.enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def timed(name):
+    """Decorator version of timer()."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot():
+    """Plain dict of every counter and histogram."""
+    return {
+        "counters": dict(_registry.counters),
+        "histograms": {
+            name: histogram.to_dict()
+            for name, histogram in _registry.histograms.items()
+        },
+    }
+
+
+def merge(other):
+    """
+    Add a snapshot() taken in another process, e.g. a pool worker, into
+    this registry so one export covers every process.
+    """
+    for name, value in other["counters"].items():
+        _registry.counters[name] = _registry.counters.get(name, 0) + value
+    for name, data in other["histograms"].items():
+        buckets = tuple(float(bound) for bound in data["buckets"])
+        histogram = _registry.histograms.get(name)
+        if histogram is None:
+            histogram = _registry.histograms[name] = _Histogram(buckets)
+        elif histogram.buckets != buckets:
+            raise ValueError(f"Histogram {name} has different buckets")
+        previous = 0
+        for i, cumulative in enumerate(data["buckets"].values()):
+            histogram.counts[i] += cumulative - previous
+            previous = cumulative
+        histogram.sum += data["sum"]
+        histogram.count += data["count"]
+
+
+def _prometheus_name(name):
+    return PROMETHEUS_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def to_prometheus_text():
+    """Render the registry in the Prometheus text exposition format."""
+    lines = []
+    for name, value in sorted(_registry.counters.items()):
+        metric = _prometheus_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, histogram in sorted(_registry.histograms.items()):
+        metric = _prometheus_name(name) + "_seconds"
+        data = histogram.to_dict()
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, cumulative in data["buckets"].items():
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {data['sum']}")
+        lines.append(f"{metric}_count {data['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Write the registry to path, as JSON for .json files else Prometheus text."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        if path.endswith(".json"):
+            json.dump(snapshot(), f, indent=2)
+        else:
+            f.write(to_prometheus_text())
+
+
+def configure_logging(level=None):
+    """Plain message logging for the scripts, level from ASO_LOG_LEVEL."""
+    level = level or os.environ.get(LOG_LEVEL_ENV, "INFO")
+    if isinstance(level, str):
+        level = level.upper()
+    logging.basicConfig(level=level, format="%(message)s")
+
+
+if os.environ.get(METRICS_FILE_ENV):
+    enable()
+    # Worker processes hand their snapshot() to the parent to merge()
+    if multiprocessing.parent_process() is None:
+        atexit.register(export, os.environ[METRICS_FILE_ENV])
@@ -2,8 +2,18 @@
 
 # Import required libraries
 import datetime as dt
+import logging
+import os
+import sys
 import matplotlib.pyplot as plt
 
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Instrumentation")
+)
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
 # VOLTTRON-style EMA function
 def ema(lst):
     smoothing_constant = 2.0 / (len(lst) + 1.0) * 2.0 if lst else 1.0
@@ -148,5 +158,8 @@ update_parameters(historical_data)
 optimal_start_time = calculate_optimal_start(current_conditions, alpha_3a, alpha_3b, alpha_3d)
 
 # Log the results
-print(f"Optimal Start Time in Minutes: {optimal_start_time:.2f}")
-print(f"Parameters: alpha_3a={alpha_3a:.2f}, alpha_3b={alpha_3b:.2f}, alpha_3d={alpha_3d:.2f}")
+aso_metrics.configure_logging()
+logger.info("Optimal Start Time in Minutes: %.2f", optimal_start_time)
+logger.info(
+    "Parameters: alpha_3a=%.2f, alpha_3b=%.2f, alpha_3d=%.2f", alpha_3a, alpha_3b, alpha_3d
+)
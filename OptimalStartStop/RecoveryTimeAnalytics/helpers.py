@@ -1,5 +1,199 @@
-import pandas as pd
+import logging
 import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Instrumentation")
+)
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
+NS_PER_MIN = 60 * 10**9
+SNAPSHOT_START_MIN = 4 * 60  # 4 AM feature window start (04:00)
+SNAPSHOT_END_MIN = 4 * 60 + 15  # 4 AM feature window end (04:15, inclusive)
+
+# How warm-up time is measured from the samples:
+#   "fixed"   - count active samples x dataset_min_per_time_step (original)
+#   "grid"    - snap data to a dataset_min_per_time_step grid first, then count
+#   "elapsed" - integrate the actual time between samples
+TIME_STEP_MODES = ("fixed", "grid", "elapsed")
+
+# Row positions of every calendar day in a time sorted frame. Day i covers
+# rows starts[i]:ends[i]; days with no data have starts[i] == ends[i].
+DayIndex = namedtuple("DayIndex", ["days", "starts", "ends", "timestamps_ns"])
+
+
+def build_day_index(index):
+    """
+    Precompute start/end row positions per calendar day with searchsorted
+    on the int64 timestamps. Every daily stage reduces over these
+    contiguous slices instead of resampling. Each day ends where the next
+    calendar day starts, so 23 and 25 hour DST days of a tz-aware index
+    get the right rows.
+    """
+    if not index.is_monotonic_increasing:
+        raise ValueError("Data must be sorted by timestamp to build a day index")
+
+    timestamps_ns = index.as_unit("ns").asi8
+    if len(index) == 0:
+        boundaries = pd.DatetimeIndex([], name=index.name)
+    else:
+        num_days = (index[-1].date() - index[0].date()).days + 1
+        boundaries = pd.date_range(
+            index[0].normalize(), periods=num_days + 1, freq="D", name=index.name
+        )
+    positions = np.searchsorted(
+        timestamps_ns, boundaries.as_unit("ns").asi8, side="left"
+    )
+    return DayIndex(boundaries[:-1], positions[:-1], positions[1:], timestamps_ns)
+
+
+def _wall_clock_ns(index):
+    """Local wall clock int64 nanoseconds, dropping the time zone if any."""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit("ns").asi8
+
+
+def select_day_rows(day_index, mask):
+    """
+    Day index of data[mask]. Kept rows of a day stay contiguous, so the
+    new boundaries are just the running count of kept rows.
+    """
+    kept_before = np.concatenate(([0], np.cumsum(mask)))
+    return DayIndex(
+        day_index.days,
+        kept_before[day_index.starts],
+        kept_before[day_index.ends],
+        day_index.timestamps_ns[mask],
+    )
+
+
+def align_to_grid(data, step_minutes):
+    """
+    Reduce irregular data to one sample per step_minutes slot in one pass,
+    keeping the first sample in each slot. Dense bursts (e.g. 1 second
+    samples in 5 minute data) collapse to one row; empty slots are left
+    out rather than filled, so gaps don't add rows either. Kept rows keep
+    their original timestamps, so per-row flags still merge back onto the
+    raw data by index.
+    """
+    step_ns = step_minutes * NS_PER_MIN
+    slots = data.index.as_unit("ns").asi8 // step_ns
+    first_in_slot = np.ones(len(slots), dtype=bool)
+    first_in_slot[1:] = slots[1:] != slots[:-1]
+    return data[first_in_slot].copy()
+
+
+def sample_minutes(day_index, step_minutes):
+    """
+    Minutes each sample represents: the time until the next sample of the
+    same day, capped at step_minutes so data gaps are not counted. The last
+    sample of a day counts as one full step.
+    """
+    timestamps_ns = day_index.timestamps_ns
+    minutes = np.full(len(timestamps_ns), float(step_minutes))
+    minutes[:-1] = np.minimum(np.diff(timestamps_ns) / NS_PER_MIN, step_minutes)
+
+    has_rows = day_index.ends > day_index.starts
+    minutes[day_index.ends[has_rows] - 1] = step_minutes
+    return minutes
+
+
+def trailing_step_rise(values, day_index, step_minutes):
+    """
+    Rise of each sample over the last sample of the same day at least one
+    step earlier, so a 1 second burst is compared with the reading 5
+    minutes before it, not 1 second before. Rises over more than a step
+    (data gaps, jittered timestamps) are scaled down to a per-step rise.
+    NaN where the day has no sample a step earlier.
+    """
+    values = np.asarray(values, dtype=float)
+    timestamps_ns = day_index.timestamps_ns
+    step_ns = step_minutes * NS_PER_MIN
+    prev = np.searchsorted(timestamps_ns, timestamps_ns - step_ns, side="right") - 1
+
+    rise = np.full(len(values), np.nan)
+    valid = prev >= day_index.starts[_row_day(day_index)]
+    rows = np.flatnonzero(valid)
+    gap_ns = timestamps_ns[rows] - timestamps_ns[prev[rows]]
+    rise[rows] = (values[rows] - values[prev[rows]]) * (
+        step_ns / np.maximum(gap_ns, step_ns)
+    )
+    return rise
+
+
+def _row_day(day_index):
+    """Position in day_index.days of every row."""
+    rows_per_day = day_index.ends - day_index.starts
+    return np.repeat(np.arange(len(day_index.days)), rows_per_day)
+
+
+def daily_reduce(values, day_index, how):
+    """
+    Reduce values over each day's slice. NaN values are skipped like
+    resample(); days with no values are NaN ("sum" gives 0).
+    how is one of "min", "max", "mean", "sum".
+    """
+    values = np.asarray(values, dtype=float)
+    has_rows = day_index.ends > day_index.starts
+    starts = day_index.starts[has_rows]
+
+    result = np.full(len(day_index.days), 0.0 if how == "sum" else np.nan)
+    if not has_rows.any():
+        return result
+
+    if how == "min":
+        result[has_rows] = np.fmin.reduceat(values, starts)
+    elif how == "max":
+        result[has_rows] = np.fmax.reduceat(values, starts)
+    elif how in ("mean", "sum"):
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        if how == "sum":
+            result[has_rows] = sums
+        else:
+            counts = np.add.reduceat(valid, starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[has_rows] = np.where(counts > 0, sums / counts, np.nan)
+    else:
+        raise ValueError(f"Unknown reduction: {how}")
+    return result
+
+
+def daily_snapshot(
+    data, day_index, start_min=SNAPSHOT_START_MIN, end_min=SNAPSHOT_END_MIN
+):
+    """
+    First non-NaN value of each column between start_min and end_min
+    (minutes after midnight, inclusive) of every day, e.g. the 4 AM
+    SpaceTemp/OaTemp/HwsTemp features. Times are wall clock, like
+    between_time(), so DST days keep their 4 AM.
+    """
+    row_day = _row_day(day_index)
+    day_start_ns = _wall_clock_ns(day_index.days)
+    time_of_day = _wall_clock_ns(data.index) - day_start_ns[row_day]
+    in_window = (time_of_day >= start_min * NS_PER_MIN) & (
+        time_of_day <= end_min * NS_PER_MIN
+    )
+
+    snapshot = {}
+    for col in data.columns:
+        values = data[col].to_numpy(dtype=float)
+        candidates = np.flatnonzero(in_window & ~np.isnan(values))
+        first = np.searchsorted(candidates, day_index.starts)
+        found = first < len(candidates)
+        found[found] = candidates[first[found]] < day_index.ends[found]
+
+        column = np.full(len(day_index.days), np.nan)
+        column[found] = values[candidates[first[found]]]
+        snapshot[col] = column
+    return pd.DataFrame(snapshot, index=day_index.days)
 
 
 def save_results_to_csv(results, output_dir):
@@ -9,15 +203,24 @@ def save_results_to_csv(results, output_dir):
     os.makedirs(output_dir, exist_ok=True)  # Ensure the directory exists
     csv_output_path = os.path.join(output_dir, "daily_results.csv")
     results.to_csv(csv_output_path, index=True)
-    print(f"Results saved to {csv_output_path}")
+    logger.info("Results saved to %s", csv_output_path)
 
 
-def calculate_daily_setpoints(data, exclude_daytypes):
+def calculate_daily_setpoints(data, exclude_daytypes, day_index=None):
     """
     Calculate daily occupied and unoccupied thresholds for each day.
     """
-    daily_stats = data.resample("D").agg({"SpaceTemp": ["min", "max", "mean"]})
-    daily_stats.columns = ["min", "max", "mean"]
+    if day_index is None:
+        day_index = build_day_index(data.index)
+    space_temp = data["SpaceTemp"].to_numpy(dtype=float)
+    daily_stats = pd.DataFrame(
+        {
+            "min": daily_reduce(space_temp, day_index, "min"),
+            "max": daily_reduce(space_temp, day_index, "max"),
+            "mean": daily_reduce(space_temp, day_index, "mean"),
+        },
+        index=day_index.days,
+    )
 
     thresholds = daily_stats[
         ~daily_stats.index.day_name().isin(exclude_daytypes)
@@ -33,46 +236,58 @@ def process_data_with_daily_setpoints(
     zone_temp_prox_thres,
     steep_increase_thres,
     warmup_window_hours,
+    day_index=None,
+    elapsed_step_minutes=None,
 ):
     """
     Process the data using daily thresholds for warm-up calculations.
+    With elapsed_step_minutes set, the steep increase test uses the rise
+    over the trailing step (trailing_step_rise) instead of the change from
+    the previous sample, so sample spacing doesn't change the result.
     """
-    # Ensure the day column is of the same type as the daily_setpoints index
-    data["day"] = pd.to_datetime(data.index.date)
+    if day_index is None:
+        day_index = build_day_index(data.index)
 
     # Filter data to only include rows within the warm-up window hours
-    filtered_data = data[data.index.hour.isin(warmup_window_hours)].copy()
-    filtered_data["Warm_Up_Active"] = 0  # Initialize column
-
-    for day, thresholds in daily_setpoints.iterrows():
-        day = pd.to_datetime(day)
-        day_data = filtered_data[filtered_data["day"] == day].copy()
-        if day_data.empty:
-            print(f"No data for day: {day}. Skipping...")
-            continue
-
-        occupied_threshold = thresholds["occupied_threshold"]
-        unoccupied_threshold = thresholds["unoccupied_threshold"]
-
-        # Identify steep increases and near-occupied thresholds
-        day_data["temp_steep_increase"] = (
-            day_data["SpaceTemp"].diff() > steep_increase_thres
-        ) & (day_data["SpaceTemp"] >= (unoccupied_threshold + zone_temp_prox_thres))
-        day_data["near_occupied_threshold"] = (
-            day_data["SpaceTemp"] >= (occupied_threshold - zone_temp_prox_thres)
-        ) & (day_data["SpaceTemp"] <= (occupied_threshold + zone_temp_prox_thres))
-
-        # Apply warm-up logic
-        warm_up_active = False
-        for row in day_data.itertuples():
-            if row.temp_steep_increase:
-                warm_up_active = True
-            if row.near_occupied_threshold:
-                warm_up_active = False
-            day_data.loc[row.Index, "Warm_Up_Active"] = int(warm_up_active)
-
-        # Update the main filtered DataFrame
-        filtered_data.loc[day_data.index, "Warm_Up_Active"] = day_data["Warm_Up_Active"]
+    in_window = np.asarray(data.index.hour.isin(warmup_window_hours))
+    filtered_data = data[in_window].copy()
+    day_index = select_day_rows(day_index, in_window)
+
+    # Per row thresholds; days without setpoints get NaN and never warm up
+    day_thresholds = daily_setpoints.reindex(day_index.days)
+    row_day = _row_day(day_index)
+    occupied_threshold = day_thresholds["occupied_threshold"].to_numpy(float)[row_day]
+    unoccupied_threshold = day_thresholds["unoccupied_threshold"].to_numpy(float)[
+        row_day
+    ]
+    space_temp = filtered_data["SpaceTemp"].to_numpy(dtype=float)
+
+    # Identify steep increases (within a day) and near-occupied thresholds
+    if elapsed_step_minutes is None:
+        temp_diff = np.full(len(space_temp), np.nan)
+        temp_diff[1:] = np.diff(space_temp)
+        temp_diff[day_index.starts[day_index.starts < len(space_temp)]] = np.nan
+    else:
+        temp_diff = trailing_step_rise(space_temp, day_index, elapsed_step_minutes)
+    with np.errstate(invalid="ignore"):
+        temp_steep_increase = (temp_diff > steep_increase_thres) & (
+            space_temp >= (unoccupied_threshold + zone_temp_prox_thres)
+        )
+        near_occupied_threshold = (
+            space_temp >= (occupied_threshold - zone_temp_prox_thres)
+        ) & (space_temp <= (occupied_threshold + zone_temp_prox_thres))
+
+    # Warm-up latch: a steep increase turns it on, reaching the occupied
+    # threshold turns it off (off wins), and it resets at the start of
+    # each day. Carry the last event forward instead of looping rows.
+    positions = np.arange(len(space_temp))
+    event = temp_steep_increase | near_occupied_threshold
+    last_event = np.maximum.accumulate(np.where(event, positions, -1))
+    day_first_row = day_index.starts[row_day]
+    warm_up_active = (last_event >= day_first_row) & ~near_occupied_threshold[
+        np.maximum(last_event, 0)
+    ]
+    filtered_data["Warm_Up_Active"] = warm_up_active.astype(int)
 
     return filtered_data
 
@@ -87,42 +302,122 @@ def analyze_warm_up(
     dataset_min_per_time_step,
     max_warmup_time_minutes,
     warmup_window_hours,  # Add this parameter
+    time_step_mode="fixed",
 ):
-    print(f"\nAnalyzing warm-up for {start_date} to {end_date}...")
-    subset_data = data.loc[start_date:end_date].copy()
-
-    print("Step 1: Calculating daily setpoints...")
-    daily_setpoints = calculate_daily_setpoints(subset_data, exclude_daytypes)
-
-    print("Step 2: Processing data with daily setpoints...")
-    subset_data = process_data_with_daily_setpoints(
-        subset_data,
-        daily_setpoints,
-        zone_temp_prox_thres,
-        steep_increase_thres,
-        warmup_window_hours,  # Pass the warmup window hours here
-    )
+    """
+    Daily warm-up durations with 4AM features. See TIME_STEP_MODES for how
+    irregular sample spacing is handled.
+    """
+    if time_step_mode not in TIME_STEP_MODES:
+        raise ValueError(f"Unknown time_step_mode: {time_step_mode}")
 
-    print("Step 3: Calculating warm-up durations and results...")
-    daily_warm_up_duration = subset_data["Warm_Up_Active"].resample("D").sum()
-    daily_warm_up_duration_minutes = daily_warm_up_duration * dataset_min_per_time_step
+    logger.info("Analyzing warm-up for %s to %s...", start_date, end_date)
+    subset_data = data.loc[start_date:end_date]
+    if time_step_mode == "grid":
+        subset_data = align_to_grid(subset_data, dataset_min_per_time_step)
+    else:
+        subset_data = subset_data.copy()
+    aso_metrics.counter("recovery.warm_up.rows_processed", len(subset_data))
 
-    daily_4am_values = subset_data.between_time("04:00", "04:15").resample("D").first()
-    daily_warm_up_duration_minutes = daily_warm_up_duration_minutes.reindex(
-        daily_4am_values.index
-    ).fillna(0).clip(upper=max_warmup_time_minutes)
+    # Day boundaries are computed once and shared by every stage below
+    day_index = build_day_index(subset_data.index)
 
-    results = pd.DataFrame(
-        {
-            "Warm_Up_Duration (minutes)": daily_warm_up_duration_minutes,
-            "4AM SpaceTemp": daily_4am_values["SpaceTemp"],
-            "4AM OaTemp": daily_4am_values["OaTemp"],
-            "4AM HwsTemp": daily_4am_values["HwsTemp"],
-            "Day_of_Week": daily_4am_values.index.dayofweek,
-        }
-    ).dropna()
+    logger.info("Step 1: Calculating daily setpoints...")
+    with aso_metrics.timer("recovery.warm_up.daily_setpoints"):
+        daily_setpoints = calculate_daily_setpoints(
+            subset_data, exclude_daytypes, day_index
+        )
+
+    logger.info("Step 2: Processing data with daily setpoints...")
+    with aso_metrics.timer("recovery.warm_up.process_daily_setpoints"):
+        in_window = np.asarray(subset_data.index.hour.isin(warmup_window_hours))
+        subset_data = process_data_with_daily_setpoints(
+            subset_data,
+            daily_setpoints,
+            zone_temp_prox_thres,
+            steep_increase_thres,
+            warmup_window_hours,  # Pass the warmup window hours here
+            day_index,
+            dataset_min_per_time_step if time_step_mode == "elapsed" else None,
+        )
+        day_index = select_day_rows(day_index, in_window)
+
+    logger.info("Step 3: Calculating warm-up durations and results...")
+    with aso_metrics.timer("recovery.warm_up.durations"):
+        warm_up_active = subset_data["Warm_Up_Active"].to_numpy()
+        if time_step_mode == "elapsed":
+            warm_up_minutes = warm_up_active * sample_minutes(
+                day_index, dataset_min_per_time_step
+            )
+            daily_warm_up_duration_minutes = daily_reduce(
+                warm_up_minutes, day_index, "sum"
+            )
+        else:
+            daily_warm_up_duration = daily_reduce(
+                warm_up_active, day_index, "sum"
+            ).astype(int)
+            daily_warm_up_duration_minutes = (
+                daily_warm_up_duration * dataset_min_per_time_step
+            )
+        daily_warm_up_duration_minutes = np.minimum(
+            daily_warm_up_duration_minutes, max_warmup_time_minutes
+        )
+
+        daily_4am_values = daily_snapshot(
+            subset_data[["SpaceTemp", "OaTemp", "HwsTemp"]], day_index
+        )
+
+        results = pd.DataFrame(
+            {
+                "Warm_Up_Duration (minutes)": daily_warm_up_duration_minutes,
+                "4AM SpaceTemp": daily_4am_values["SpaceTemp"],
+                "4AM OaTemp": daily_4am_values["OaTemp"],
+                "4AM HwsTemp": daily_4am_values["HwsTemp"],
+                "Day_of_Week": daily_4am_values.index.dayofweek,
+            },
+            index=day_index.days,
+        ).dropna()
+    aso_metrics.counter("recovery.warm_up.days_analyzed", len(results))
 
     return subset_data, daily_setpoints, results
 
 
+def _burst_ramp_day(day="2024-01-15", burst_minutes=30):
+    """
+    One day of 5 minute data with a 1 second burst over a 1°F per 5 minute
+    warm-up ramp from 65°F at 06:00 to 71°F.
+    """
+    day = pd.Timestamp(day)
+    index = pd.date_range(day, day + pd.Timedelta("23:55:00"), freq="5min").union(
+        pd.date_range(
+            day + pd.Timedelta(hours=6),
+            day + pd.Timedelta(hours=6, minutes=burst_minutes),
+            freq="1s",
+        )
+    )
+    minutes = (index - day).total_seconds().to_numpy() / 60
+    space_temp = np.clip(65 + (minutes - 6 * 60) / 5, 65, 71)
+    return pd.DataFrame(
+        {"SpaceTemp": space_temp, "OaTemp": 10.0, "HwsTemp": 150.0},
+        index=pd.DatetimeIndex(index, name="timestamp"),
+    )
+
 
+if __name__ == "__main__":
+    # Mixed-rate check: a 1 second burst over a warm-up ramp must give the
+    # same warm-up time in "grid" and "elapsed" modes (within one step)
+    aso_metrics.configure_logging()
+    hours = [4, 6, 7, 8, 9, 10]
+    data = _burst_ramp_day()
+    data = data[data.index.hour.isin(hours)]
+    minutes = {}
+    for mode in ("grid", "elapsed"):
+        results = analyze_warm_up(
+            data, data.index[0], data.index[-1], [], 0.5, 0.6, 5, 230, hours, mode
+        )[2]
+        minutes[mode] = float(results["Warm_Up_Duration (minutes)"].iloc[0])
+    logger.info("Warm-up minutes on a 1 s burst ramp: %s", minutes)
+    if minutes["elapsed"] < 20 or abs(minutes["grid"] - minutes["elapsed"]) > 5:
+        logger.error("FAIL: elapsed mode does not match grid mode on the burst ramp")
+        sys.exit(1)
+    logger.info("OK")
@@ -1,26 +1,44 @@
+import argparse
+import json
+import logging
+import multiprocessing
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Instrumentation")
+)
+import aso_metrics
 from helpers import (
-    calculate_daily_setpoints,
-    process_data_with_daily_setpoints,
     analyze_warm_up,
     save_results_to_csv,
 )
-from plotting_utils import (
-    plot_line_chart,
-    plot_bar_chart,
-    plot_temperature_distribution,
-    plot_degrees_per_hour,
-    plot_relationship_matrix
+from results_store import (
+    update_daily_store,
+    window_fingerprint,
+    window_needs_rebuild,
+    mark_window_built,
+    save_meta,
 )
 
+# plotting_utils (matplotlib/seaborn) is imported on first use, so
+# analysis-only runs don't pay for it
+
+logger = logging.getLogger("main")
+
 # Constants
 EXCLUDE_DAYTYPES = [] # ["Saturday", "Sunday", "Monday"]
 WARMUP_WINDOWS_HOURS = [4,6,7,8,9,10]
 ZONE_TEMP_PROX_THRES = 0.5  # °F
 STEEP_INCREASE_THRES = 0.6  # °F
 DATASET_MIN_PER_TIME_STEP = 5
+TIME_STEP_MODE = "fixed"  # "fixed", "grid" or "elapsed" for mixed-rate exports
 MAX_WARMUP_TIME_MINUTES = 230
+DATA_FILE = "AllData.csv"
 OUTPUT_DIR = "Analysis_Results"
 
 time_ranges = {
@@ -32,76 +50,71 @@ time_ranges = {
     "Xmas_Thru_March": ("2023-12-24", "2024-03-01"),
 }
 
-# Load data
-cold_snap_data = pd.read_csv("AllData.csv")
-cold_snap_data["timestamp"] = pd.to_datetime(cold_snap_data["timestamp"])
-cold_snap_data.set_index("timestamp", inplace=True)
-
-# Remove rows where SpaceTemp is 0
-cold_snap_data = cold_snap_data[cold_snap_data["SpaceTemp"] != 0]
-
-# Analyze each time range and generate plots
-for label, (start, end) in time_ranges.items():
-    print(f"\nAnalyzing: {label}")
-    output_subdir = os.path.join(OUTPUT_DIR, label)
-
-    # Step-by-step troubleshooting: Call functions explicitly
-    print(f"Step 1: Filtering data for time range {start} to {end}")
-    subset_data = cold_snap_data.loc[start:end].copy()  # Original data retained for plotting
-
-    # Create filtered data for calculations
-    print("Step 1.1: Filtering data for warm-up window hours")
-    filtered_data = subset_data[subset_data.index.hour.isin(WARMUP_WINDOWS_HOURS)].copy()
-    if filtered_data.empty:
-        print(f"[WARNING!] Filtered data is empty for time range {start} to {end}. Skipping analysis.")
-        continue
-
-    print("Step 2: Calculating daily setpoints...")
-    daily_setpoints = calculate_daily_setpoints(filtered_data, EXCLUDE_DAYTYPES)
-    print(daily_setpoints[["occupied_threshold", "unoccupied_threshold"]])
-
-    print("Step 3: Processing data with daily setpoints...")
-    filtered_data = process_data_with_daily_setpoints(
-        filtered_data,
-        daily_setpoints,
-        ZONE_TEMP_PROX_THRES,
-        STEEP_INCREASE_THRES,
-        WARMUP_WINDOWS_HOURS,
-    )
+# Any change to these resets a building's daily store
+ANALYSIS_PARAMS = (
+    "exclude_daytypes",
+    "warmup_windows_hours",
+    "zone_temp_prox_thres",
+    "steep_increase_thres",
+    "dataset_min_per_time_step",
+    "time_step_mode",
+    "max_warmup_time_minutes",
+)
+
+# One building's job. Manifest entries override any of these keys.
+DEFAULT_CONFIG = {
+    "name": "AllData",
+    "data_file": DATA_FILE,
+    "output_dir": OUTPUT_DIR,
+    "time_ranges": time_ranges,
+    "plots": True,
+    "exclude_daytypes": EXCLUDE_DAYTYPES,
+    "warmup_windows_hours": WARMUP_WINDOWS_HOURS,
+    "zone_temp_prox_thres": ZONE_TEMP_PROX_THRES,
+    "steep_increase_thres": STEEP_INCREASE_THRES,
+    "dataset_min_per_time_step": DATASET_MIN_PER_TIME_STEP,
+    "time_step_mode": TIME_STEP_MODE,
+    "max_warmup_time_minutes": MAX_WARMUP_TIME_MINUTES,
+}
 
-    print("Step 4: Analyzing warm-up data...")
-    _, _, results = analyze_warm_up(
-        filtered_data,  # Use filtered data for calculations
+
+def load_building_data(data_file):
+    with aso_metrics.timer("recovery.load_data"):
+        data = pd.read_csv(data_file)
+        data["timestamp"] = pd.to_datetime(data["timestamp"])
+        data.set_index("timestamp", inplace=True)
+
+        # Remove rows where SpaceTemp is 0
+        data = data[data["SpaceTemp"] != 0]
+    aso_metrics.counter("recovery.rows_loaded", len(data))
+    return data
+
+
+def _analyze(config, data, start, end):
+    return analyze_warm_up(
+        data,
         start,
         end,
-        EXCLUDE_DAYTYPES,
-        ZONE_TEMP_PROX_THRES,
-        STEEP_INCREASE_THRES,
-        DATASET_MIN_PER_TIME_STEP,
-        MAX_WARMUP_TIME_MINUTES,
-        WARMUP_WINDOWS_HOURS,
+        config["exclude_daytypes"],
+        config["zone_temp_prox_thres"],
+        config["steep_increase_thres"],
+        config["dataset_min_per_time_step"],
+        config["max_warmup_time_minutes"],
+        config["warmup_windows_hours"],
+        config["time_step_mode"],
     )
 
-    # Merge Warm_Up_Active column back into subset_data for plotting
-    print("Step 5: Merging Warm_Up_Active column back into subset_data for plotting...")
-    subset_data = subset_data.merge(
-        filtered_data[["Warm_Up_Active"]], how="left", left_index=True, right_index=True
-    )
-    subset_data["Warm_Up_Active"].fillna(0, inplace=True)  # Fill missing values with 0
-
-    # Debug results
-    if not results.empty:
-        print("Results:")
-        print(results.describe())
-
-        # Ensure the output directory exists
-        os.makedirs(output_subdir, exist_ok=True)
 
-        # Save the results to the corresponding directory
-        save_results_to_csv(results, output_subdir)
+def _generate_plots(subset_data, daily_setpoints, results, output_subdir, start, end):
+    from plotting_utils import (
+        plot_line_chart,
+        plot_bar_chart,
+        plot_temperature_distribution,
+        plot_degrees_per_hour,
+        plot_relationship_matrix
+    )
 
-        # Generate plots using the full dataset (subset_data)
-        print("Generating plots...")
+    with aso_metrics.timer("recovery.plots"):
         plot_line_chart(
             subset_data,  # Full data for plotting, now with Warm_Up_Active column
             daily_setpoints["occupied_threshold"].mean(),
@@ -112,8 +125,255 @@ for label, (start, end) in time_ranges.items():
         plot_temperature_distribution(subset_data, output_subdir, f"{start}_to_{end}")
         plot_degrees_per_hour(results, output_subdir)
         plot_relationship_matrix(results, output_subdir)
-    else:
-        print(
-            f"[ERROR!] Results are empty for time range {start} to {end}. \n",
-            "SKIPPING ANY PLOTTING!!",
+
+
+def run_building(config):
+    """
+    Update one building's daily store and rebuild its changed time ranges.
+    config is DEFAULT_CONFIG with any overrides. Returns a summary dict.
+    """
+    config = {**DEFAULT_CONFIG, **config}
+    name = config["name"]
+    output_dir = config["output_dir"]
+    hours = config["warmup_windows_hours"]
+    job_start = time.perf_counter()
+
+    logger.info("%s: loading %s", name, config["data_file"])
+    data = load_building_data(config["data_file"])
+
+    def compute_daily_results(data, start, end):
+        filtered_data = data[data.index.hour.isin(hours)]
+        if filtered_data.empty:
+            return pd.DataFrame()
+        return _analyze(config, filtered_data, start, end)[2]
+
+    # Per-day results are independent of the time range, so only days past the
+    # last run's watermark are computed and each window is a slice of the store
+    store_params = {key: config[key] for key in ANALYSIS_PARAMS}
+    with aso_metrics.timer("recovery.update_store"):
+        daily_store, store_meta = update_daily_store(
+            data, output_dir, store_params, compute_daily_results
+        )
+
+    # Rebuild the plots and results of time ranges whose days changed
+    built = []
+    for label, (start, end) in config["time_ranges"].items():
+        logger.info("%s: analyzing %s", name, label)
+        output_subdir = os.path.join(output_dir, label)
+
+        results = daily_store.loc[start:end] if not daily_store.empty else daily_store
+        if results.empty:
+            logger.error(
+                "Results are empty for time range %s to %s. SKIPPING ANY PLOTTING!!",
+                start,
+                end,
+            )
+            continue
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Results:\n%s", results.describe())
+
+        fingerprint = window_fingerprint(results)
+        if not window_needs_rebuild(
+            store_meta, label, fingerprint, output_subdir, plots=config["plots"]
+        ):
+            logger.info("No new days for %s, skipping", label)
+            aso_metrics.counter("recovery.windows_skipped")
+            continue
+
+        if not config["plots"]:
+            # Analysis only, only the results marker is set so a later run plots it
+            os.makedirs(output_subdir, exist_ok=True)
+            save_results_to_csv(results, output_subdir)
+            mark_window_built(store_meta, label, fingerprint, plots=False)
+            built.append(label)
+            continue
+
+        # Step-by-step troubleshooting: Call functions explicitly
+        logger.info("Step 1: Filtering data for time range %s to %s", start, end)
+        with aso_metrics.timer("recovery.filter"):
+            subset_data = data.loc[start:end].copy()  # Original data retained for plotting
+
+            # Create filtered data for calculations
+            logger.info("Step 1.1: Filtering data for warm-up window hours")
+            filtered_data = subset_data[subset_data.index.hour.isin(hours)].copy()
+        aso_metrics.counter("recovery.rows_processed", len(subset_data))
+
+        # Warm-up flags and thresholds for the plots, results come from the store
+        logger.info("Step 2: Analyzing warm-up data...")
+        filtered_data, daily_setpoints, _ = _analyze(config, filtered_data, start, end)
+
+        # Merge Warm_Up_Active column back into subset_data for plotting
+        logger.debug("%s", daily_setpoints[["occupied_threshold", "unoccupied_threshold"]])
+        logger.info("Step 3: Merging Warm_Up_Active column back into subset_data for plotting...")
+        subset_data = subset_data.merge(
+            filtered_data[["Warm_Up_Active"]], how="left", left_index=True, right_index=True
         )
+        subset_data["Warm_Up_Active"] = subset_data["Warm_Up_Active"].fillna(0)  # Fill missing values with 0
+
+        # Save the results to the corresponding directory
+        os.makedirs(output_subdir, exist_ok=True)
+        save_results_to_csv(results, output_subdir)
+
+        # Generate plots using the full dataset (subset_data)
+        logger.info("Generating plots...")
+        _generate_plots(subset_data, daily_setpoints, results, output_subdir, start, end)
+        mark_window_built(store_meta, label, fingerprint)
+        built.append(label)
+
+    save_meta(output_dir, store_meta)
+    return {
+        "name": name,
+        "days": len(daily_store),
+        "windows_built": built,
+        "seconds": time.perf_counter() - job_start,
+    }
+
+
+def load_manifest(path):
+    """
+    Read a JSON manifest into one config per building:
+
+        {
+          "defaults": {"steep_increase_thres": 0.6, "plots": false},
+          "buildings": [
+            {"name": "School_A", "data_file": "school_a.csv"},
+            {"name": "Office_B", "data_file": "office_b.csv",
+             "zone_temp_prox_thres": 1.0,
+             "time_ranges": {"Jan": ["2024-01-01", "2024-01-31"]}}
+          ]
+        }
+
+    Building keys override "defaults", which override DEFAULT_CONFIG.
+    Relative paths are relative to the manifest. output_dir defaults to
+    Analysis_Results/<name>.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+
+    configs = []
+    for building in manifest["buildings"]:
+        config = {**defaults, **building}
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(
+                f"Unknown manifest keys for {config.get('name')}: {sorted(unknown)}"
+            )
+        if "name" not in config or "data_file" not in config:
+            raise ValueError(f"Manifest buildings need a name and data_file: {building}")
+        config.setdefault("output_dir", os.path.join(OUTPUT_DIR, config["name"]))
+        for key in ("data_file", "output_dir"):
+            config[key] = os.path.join(base_dir, config[key])
+        configs.append(config)
+
+    names = [config["name"] for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate building names in manifest: {names}")
+    return configs
+
+
+def _warm_imports(plots):
+    """
+    Pool initializer. With fork the workers inherit the parent's imports, so
+    this is a no-op; with spawn each worker imports once, not once per job.
+    """
+    aso_metrics.configure_logging()
+    if plots:
+        import plotting_utils  # noqa: F401
+
+
+def _run_job(config):
+    try:
+        return run_building(config)
+    except Exception:
+        logger.exception("%s: job failed", config.get("name"))
+        return {"name": config.get("name"), "error": True}
+
+
+def _run_pool_job(config):
+    """
+    _run_job in a pool worker. The worker's metrics start empty for each
+    job and go back to the parent with the summary, since workers don't
+    export ASO_METRICS_FILE themselves.
+    """
+    aso_metrics.reset()
+    summary = _run_job(config)
+    summary["metrics"] = aso_metrics.snapshot()
+    return summary
+
+
+def run_buildings(configs, workers=None):
+    """
+    Run every building job, in a process pool when workers > 1. Returns
+    the summary dicts in config order; failed jobs have "error": True.
+    """
+    configs = list(configs)
+    plots = any(config.get("plots", DEFAULT_CONFIG["plots"]) for config in configs)
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1:
+        return [_run_job(config) for config in configs]
+
+    # Import the heavy modules once here so forked workers share them
+    _warm_imports(plots)
+    context = (
+        multiprocessing.get_context("fork")
+        if "fork" in multiprocessing.get_all_start_methods()
+        else None
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_warm_imports,
+        initargs=(plots,),
+    ) as pool:
+        summaries = list(pool.map(_run_pool_job, configs))
+    for summary in summaries:
+        aso_metrics.merge(summary.pop("metrics"))
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-up recovery time analytics")
+    parser.add_argument(
+        "manifest",
+        nargs="?",
+        help="JSON manifest of buildings (default: AllData.csv with the constants above)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-plots", action="store_true", help="Only write daily_results.csv"
+    )
+    args = parser.parse_args(argv)
+
+    aso_metrics.configure_logging()
+    configs = load_manifest(args.manifest) if args.manifest else [dict(DEFAULT_CONFIG)]
+    if args.no_plots:
+        for config in configs:
+            config["plots"] = False
+
+    start = time.perf_counter()
+    summaries = run_buildings(configs, args.workers)
+    failed = [summary["name"] for summary in summaries if summary.get("error")]
+    for summary in summaries:
+        if not summary.get("error"):
+            logger.info(
+                "%s: %s days, %s windows written in %.1fs",
+                summary["name"],
+                summary["days"],
+                len(summary["windows_built"]),
+                summary["seconds"],
+            )
+    logger.info(
+        "%s buildings in %.1fs, %s failed",
+        len(summaries),
+        time.perf_counter() - start,
+        len(failed),
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
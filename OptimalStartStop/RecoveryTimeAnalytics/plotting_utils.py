@@ -1,6 +1,10 @@
+import logging
+import os
+
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
+
+logger = logging.getLogger(__name__)
 
 
 def plot_line_chart(subset_data, occupied_threshold, unoccupied_threshold, output_dir):
@@ -50,7 +54,7 @@ def plot_line_chart(subset_data, occupied_threshold, unoccupied_threshold, outpu
     plt.tight_layout()
     plt.savefig(line_plot_path)
     plt.close()
-    print(f"Line plot saved to {line_plot_path}")
+    logger.info("Line plot saved to %s", line_plot_path)
 
 
 def plot_bar_chart(results, output_dir):
@@ -93,7 +97,7 @@ def plot_bar_chart(results, output_dir):
     plt.tight_layout()
     plt.savefig(bar_plot_path)
     plt.close()
-    print(f"Bar plot with additional data saved to {bar_plot_path}")
+    logger.info("Bar plot with additional data saved to %s", bar_plot_path)
 
 
 def plot_temperature_distribution(subset_data, output_dir, label):
@@ -108,7 +112,7 @@ def plot_temperature_distribution(subset_data, output_dir, label):
     plt.tight_layout()
     plt.savefig(simple_hist_path)
     plt.close()
-    print(f"Simple histogram plot saved to {simple_hist_path}")
+    logger.info("Simple histogram plot saved to %s", simple_hist_path)
 
 
 def plot_degrees_per_hour(results, output_dir):
@@ -133,7 +137,7 @@ def plot_degrees_per_hour(results, output_dir):
     plt.tight_layout()
     plt.savefig(line_plot_path)
     plt.close()
-    print(f"Line plot saved to {line_plot_path}")
+    logger.info("Line plot saved to %s", line_plot_path)
 
 
 def plot_relationship_matrix(results, output_dir):
@@ -147,7 +151,7 @@ def plot_relationship_matrix(results, output_dir):
 
     # Check if there is any data left to plot
     if results_filtered.empty:
-        print(f"No data available for plotting after filtering. Skipping plot creation.")
+        logger.info("No data available for plotting after filtering. Skipping plot creation.")
         return
 
     # Add Day_of_Week column using assign to avoid SettingWithCopyWarning
@@ -172,7 +176,7 @@ def plot_relationship_matrix(results, output_dir):
     # Save the plot
     pairplot.savefig(plot_path)
     plt.close()
-    print(f"Relationship matrix plot saved to {plot_path}")
+    logger.info("Relationship matrix plot saved to %s", plot_path)
 
 
 
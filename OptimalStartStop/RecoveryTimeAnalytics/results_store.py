@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = "daily_store.csv"
+META_FILE = "store_meta.json"
+
+
+def _empty_meta(params):
+    return {"params": params, "watermark": None, "windows": {}, "results": {}}
+
+
+def load_meta(store_dir, params):
+    """
+    Load the store metadata: analysis params, watermark (last processed
+    timestamp) and per-window fingerprints. A change of params means old
+    results are stale, and a missing store file means the watermark no
+    longer describes anything on disk, so in both cases the metadata
+    starts over.
+    """
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return _empty_meta(params)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    store_path = os.path.join(store_dir, STORE_FILE)
+    if meta.get("params") != params:
+        logger.info("Analysis parameters changed, rebuilding the daily store")
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        return _empty_meta(params)
+    if meta.get("watermark") is not None and not os.path.exists(store_path):
+        logger.warning("%s is missing, rebuilding the daily store", store_path)
+        return _empty_meta(params)
+    meta.setdefault("results", {})
+    return meta
+
+
+def save_meta(store_dir, meta):
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_store(store_dir):
+    """
+    Per-day warm-up results. The file is append only; when a day was
+    recomputed (the partial last day of a previous run) the latest row wins.
+    """
+    store_path = os.path.join(store_dir, STORE_FILE)
+    if not os.path.exists(store_path):
+        return pd.DataFrame()
+    store = pd.read_csv(store_path, index_col=0, parse_dates=True)
+    store = store[~store.index.duplicated(keep="last")]
+    return store.sort_index()
+
+
+def update_daily_store(data, store_dir, params, compute_days):
+    """
+    Bring the daily store up to date with data, only computing days at or
+    after the watermark day (new days plus the partial previous day).
+
+    compute_days(data_slice, start, end) returns per-day results indexed by
+    day for the slice. Returns (store, meta); call save_meta() once the
+    windows built from the store are written.
+    """
+    meta = load_meta(store_dir, params)
+    if data.empty:
+        return load_store(store_dir), meta
+
+    end = data.index[-1]
+    if meta["watermark"] is None:
+        start = data.index[0].normalize()
+    else:
+        watermark = pd.Timestamp(meta["watermark"])
+        if watermark >= end:
+            logger.info("Daily store is up to date (watermark %s)", watermark)
+            return load_store(store_dir), meta
+        start = watermark.normalize()
+
+    logger.info("Updating daily store from %s to %s", start.date(), end.date())
+    new_results = compute_days(data.loc[start:], start, end)
+    if not new_results.empty:
+        store_path = os.path.join(store_dir, STORE_FILE)
+        os.makedirs(store_dir, exist_ok=True)
+        new_results.to_csv(
+            store_path, mode="a", header=not os.path.exists(store_path)
+        )
+    meta["watermark"] = end.isoformat()
+    return load_store(store_dir), meta
+
+
+def window_fingerprint(window_results):
+    """Hash of a window's day set and values, used to skip unchanged windows."""
+    return hashlib.sha1(window_results.to_csv().encode()).hexdigest()
+
+
+def window_needs_rebuild(meta, label, fingerprint, output_subdir, plots=True):
+    """
+    True when the window's results changed or its outputs are missing.
+    With plots=False only daily_results.csv is checked, against its own
+    marker, so an analysis-only run never counts the plots as built.
+    """
+    built = meta["windows"] if plots else meta["results"]
+    if built.get(label) != fingerprint:
+        return True
+    return not os.path.exists(os.path.join(output_subdir, "daily_results.csv"))
+
+
+def mark_window_built(meta, label, fingerprint, plots=True):
+    meta["results"][label] = fingerprint
+    if plots:
+        meta["windows"][label] = fingerprint
@@ -1,4 +1,14 @@
 import datetime
+import logging
+import os
+import sys
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Instrumentation")
+)
+import aso_metrics
+
+logger = logging.getLogger(__name__)
 
 
 class OptimizedStart:
@@ -31,7 +41,7 @@ class OptimizedStart:
 
     def update(self):
         """Calculate and display the optimized start time."""
-        print("BAS schedule starts at: ", self.next_event_time)
+        logger.info("BAS schedule starts at: %s", self.next_event_time)
         lead_time = self.calculate_lead_time()
         command_time = self.next_event_time - datetime.timedelta(minutes=lead_time)
 
@@ -40,16 +50,19 @@ class OptimizedStart:
             command_time = datetime.datetime.combine(
                 command_time.date(), self.earliest_start_time
             )
-            print("Optimized Start Calc is too early.")
-            print("Resorting back to earliest start config.", self.earliest_start_time)
+            logger.warning("Optimized Start Calc is too early.")
+            logger.warning(
+                "Resorting back to earliest start config. %s", self.earliest_start_time
+            )
 
         # Display the calculated start time
-        print(f"Optimized Start Command Time: {command_time}")
+        logger.info("Optimized Start Command Time: %s", command_time)
 
 
 if __name__ == "__main__":
     # Simulate running the script at 5:00 AM
-    print("Simulation: Running the Optimized Start Algorithm\n")
+    aso_metrics.configure_logging()
+    logger.info("Simulation: Running the Optimized Start Algorithm\n")
 
     # Initialize the optimized start system
     system = OptimizedStart()
@@ -0,0 +1,208 @@
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
+# Default Configuration Parameters
+KP = 0.5  # Proportional gain (% output per unit error)
+KI = 0.1  # Integral gain (% output per unit error per second)
+OUT_MIN = 0.0  # Minimum controller output (%)
+OUT_MAX = 100.0  # Maximum controller output (%)
+DIRECT_ACTING = 1.0  # Output rises when the measurement is above setpoint
+REVERSE_ACTING = -1.0  # Output rises when the measurement is below setpoint
+
+
+class PIControllerBank:
+    """
+    N independent PI loops (e.g. one per VAV damper) stored as flat arrays.
+
+    Gains, setpoints, integrator state, output limits and anti-windup
+    limits are all per-loop arrays, so update() evaluates every loop in one
+    vectorized call. All arithmetic is done in place into buffers allocated
+    in __init__, so a steady-state update allocates no new arrays.
+
+    Anti-windup clamps the integrator to [integral_min, integral_max]
+    (defaults to the output limits) before the output is clamped to
+    [out_min, out_max].
+
+    A non-finite measurement (a failed sensor read) holds that loop's
+    integral and output for the tick instead of integrating the NaN.
+    """
+
+    def __init__(
+        self,
+        num_loops,
+        kp=KP,
+        ki=KI,
+        out_min=OUT_MIN,
+        out_max=OUT_MAX,
+        integral_min=None,
+        integral_max=None,
+        action=REVERSE_ACTING,
+        dtype=np.float64,
+    ):
+        self.num_loops = num_loops
+        self.dtype = np.dtype(dtype)
+
+        self.kp = self._loop_array(kp)
+        self.ki = self._loop_array(ki)
+        self.action = self._loop_array(action)
+        self.out_min = self._loop_array(out_min)
+        self.out_max = self._loop_array(out_max)
+        self.integral_min = self._loop_array(
+            out_min if integral_min is None else integral_min
+        )
+        self.integral_max = self._loop_array(
+            out_max if integral_max is None else integral_max
+        )
+
+        self.setpoint = np.zeros(num_loops, dtype=self.dtype)
+        self.integral = np.zeros(num_loops, dtype=self.dtype)
+        self.output = np.zeros(num_loops, dtype=self.dtype)
+
+        # Scratch buffers reused every update
+        self._error = np.zeros(num_loops, dtype=self.dtype)
+        self._scratch = np.zeros(num_loops, dtype=self.dtype)
+        self._valid = np.zeros(num_loops, dtype=bool)
+
+    def _loop_array(self, value):
+        array = np.empty(self.num_loops, dtype=self.dtype)
+        array[...] = value
+        return array
+
+    def reset(self, mask=None):
+        """Clear integrator and output for all loops or the masked loops."""
+        if mask is None:
+            self.integral.fill(0.0)
+            self.output.fill(0.0)
+        else:
+            self.integral[mask] = 0.0
+            self.output[mask] = 0.0
+
+    def update(self, measurement, dt):
+        """
+        Advance every loop by dt seconds. measurement must be an array of
+        length num_loops with the bank's dtype to stay allocation free.
+        Loops whose measurement is NaN or inf keep their previous integral
+        and output. Returns the output buffer, which is overwritten on the
+        next call.
+        """
+        error = self._error
+        scratch = self._scratch
+        valid = self._valid
+        np.isfinite(measurement, out=valid)
+
+        # error = (measurement - setpoint) * action, positive drives output up
+        np.subtract(measurement, self.setpoint, out=error)
+        np.multiply(error, self.action, out=error)
+
+        # Integrate and clamp for anti-windup
+        np.multiply(error, self.ki, out=scratch)
+        scratch *= dt
+        np.add(self.integral, scratch, out=self.integral, where=valid)
+        np.clip(self.integral, self.integral_min, self.integral_max, out=self.integral)
+
+        # output = kp * error + integral, clamped to the output limits
+        np.multiply(error, self.kp, out=scratch)
+        scratch += self.integral
+        np.clip(scratch, self.out_min, self.out_max, out=scratch)
+        np.copyto(self.output, scratch, where=valid)
+        return self.output
+
+    @property
+    def bytes_per_loop(self):
+        arrays = [
+            self.kp,
+            self.ki,
+            self.action,
+            self.out_min,
+            self.out_max,
+            self.integral_min,
+            self.integral_max,
+            self.setpoint,
+            self.integral,
+            self.output,
+            self._error,
+            self._scratch,
+            self._valid,
+        ]
+        return sum(array.nbytes for array in arrays) / self.num_loops
+
+
+def _run_airflow_loops(bank, airflow, target, max_cfm, plant_lag, dt, num_updates):
+    for _ in range(num_updates):
+        damper = bank.update(airflow, dt)
+        # airflow += (damper% * max_cfm - airflow) * plant_lag
+        np.multiply(damper, max_cfm, out=target)
+        target *= 0.01
+        target -= airflow
+        target *= plant_lag
+        airflow += target
+
+
+def benchmark(num_loops, num_updates=1000, dt=0.5, dtype=np.float64, seed=0):
+    """
+    Run num_updates updates of a bank of VAV airflow loops against a
+    first-order airflow response and report loops per second, memory per
+    loop and the bytes allocated while updating. Throughput is timed with
+    tracing off; allocations are measured in a separate traced pass.
+    """
+    rng = np.random.default_rng(seed)
+    bank = PIControllerBank(num_loops, kp=0.05, ki=0.02, dtype=dtype)
+    bank.setpoint[:] = rng.uniform(200.0, 800.0, num_loops)  # CFM
+    max_cfm = np.full(num_loops, 1000.0, dtype=bank.dtype)
+    airflow = np.zeros(num_loops, dtype=bank.dtype)
+    target = np.zeros(num_loops, dtype=bank.dtype)
+    plant_lag = bank.dtype.type(0.2)  # Fraction of the way to target per tick
+    args = (bank, airflow, target, max_cfm, plant_lag, dt)
+
+    # Warm up once so lazily created numpy internals are not counted
+    _run_airflow_loops(*args, 1)
+
+    start = time.perf_counter()
+    _run_airflow_loops(*args, num_updates)
+    elapsed = time.perf_counter() - start
+    tracking_error = np.abs(bank.setpoint - airflow).mean()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    _run_airflow_loops(*args, min(num_updates, 100))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "loops": num_loops,
+        "dtype": bank.dtype.name,
+        "loop_updates_per_sec": num_loops * num_updates / elapsed,
+        "bytes_per_loop": bank.bytes_per_loop,
+        "peak_bytes_allocated": peak - before,
+        "mean_tracking_error_cfm": float(tracking_error),
+    }
+
+
+if __name__ == "__main__":
+    aso_metrics.configure_logging()
+    logger.info("Benchmarking PI controller bank (VAV airflow loops)...")
+    for dtype in (np.float64, np.float32):
+        for num_loops in (100, 10_000, 100_000):
+            result = benchmark(num_loops, dtype=dtype)
+            logger.info(
+                "%7s loops %s: %s loop updates/sec, %.0f bytes/loop, "
+                "%s bytes allocated while running, mean tracking error %.1f CFM",
+                result["loops"],
+                result["dtype"],
+                f"{result['loop_updates_per_sec']:,.0f}",
+                result["bytes_per_loop"],
+                result["peak_bytes_allocated"],
+                result["mean_tracking_error_cfm"],
+            )
@@ -0,0 +1,294 @@
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+_REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_REPO_DIR, "Instrumentation"))
+import aso_metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration Parameters (G36 fault condition 4 defaults)
+DELTA_OS_MAX = 7  # Max operating state / direction changes per window
+WINDOW = "60min"  # Batch sliding window (G36 evaluates changes per hour)
+WINDOW_SAMPLES = 60  # Streaming sliding window in samples (1 hour of 1 minute data)
+OUTPUT_DEADBAND = 0.5  # Output moves smaller than this (%) are not a direction
+STATE_MODE = "state"  # Count changes of an operating state column
+DIRECTION_MODE = "direction"  # Count reversals of a PID output column
+
+
+def _change_events(values, mode, deadband):
+    """
+    Mark samples that are a change event. values is a (samples, loops)
+    array. In "state" mode any change of state is an event. In
+    "direction" mode an event is an output move (beyond the deadband) in
+    the opposite direction of the last move. A NaN sample (missing
+    reading) is never an event, and the next reading is compared with the
+    last one that was present.
+    """
+    events = np.zeros(values.shape, dtype=bool)
+    if len(values) < 2:
+        return events
+
+    # Carry the last reading over dropouts, so a missing sample shows no
+    # change and the sample after it is compared with the last reading
+    values = pd.DataFrame(values).ffill().to_numpy()
+    delta = np.diff(values, axis=0)
+    if mode == STATE_MODE:
+        # NaN is left only before a loop's first reading
+        events[1:] = (delta != 0) & ~np.isnan(delta)
+        return events
+
+    direction = np.where(
+        delta > deadband, 1.0, np.where(delta < -deadband, -1.0, np.nan)
+    )
+    # Last non-zero direction seen before each sample
+    last_direction = pd.DataFrame(direction).ffill().shift(1).to_numpy()
+    events[1:] = (
+        ~np.isnan(direction)
+        & ~np.isnan(last_direction)
+        & (direction != last_direction)
+    )
+    return events
+
+
+def detect_hunting_batch(
+    trends,
+    mode=DIRECTION_MODE,
+    window=WINDOW,
+    max_changes=DELTA_OS_MAX,
+    deadband=OUTPUT_DEADBAND,
+):
+    """
+    G36 FC4 over a whole trend table. trends has a DatetimeIndex and one
+    column per control loop (PID output % or operating state code).
+    window is a pandas offset ("60min") or a sample count.
+
+    Returns (change_counts, hunting) frames shaped like trends, where
+    hunting is True when the windowed change count exceeds max_changes.
+    """
+    if mode not in (STATE_MODE, DIRECTION_MODE):
+        raise ValueError(f"Unknown mode: {mode}")
+    values = trends.to_numpy(dtype=float)
+    events = _change_events(values, mode, deadband)
+    events = pd.DataFrame(events, index=trends.index, columns=trends.columns)
+
+    if isinstance(window, int):
+        # Fixed sample window: difference of a running sum, no pandas rolling
+        running = np.cumsum(events.to_numpy(), axis=0)
+        counts = running.copy()
+        counts[window:] -= running[:-window]
+        change_counts = pd.DataFrame(
+            counts, index=trends.index, columns=trends.columns
+        )
+    else:
+        change_counts = events.rolling(window, min_periods=1).sum().astype(int)
+    hunting = change_counts > max_changes
+    return change_counts, hunting
+
+
+def summarize_hunting(hunting):
+    """Hunting samples and first flagged timestamp for each loop."""
+    flagged_at = hunting.idxmax().where(hunting.any())
+    return pd.DataFrame(
+        {
+            "hunting_samples": hunting.sum(),
+            "first_flagged": flagged_at,
+        }
+    )
+
+
+class HuntingDetector:
+    """
+    Streaming G36 FC4 detector for many loops.
+
+    Each loop keeps a ring buffer of the last window_samples change events
+    and a running count, so every update() is O(1) per loop regardless of
+    the window length. update() takes one sample for every loop at once.
+    """
+
+    def __init__(
+        self,
+        num_loops,
+        mode=DIRECTION_MODE,
+        window_samples=WINDOW_SAMPLES,
+        max_changes=DELTA_OS_MAX,
+        deadband=OUTPUT_DEADBAND,
+    ):
+        if mode not in (STATE_MODE, DIRECTION_MODE):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.num_loops = num_loops
+        self.mode = mode
+        self.window_samples = window_samples
+        self.max_changes = max_changes
+        self.deadband = deadband
+
+        self._events = np.zeros((window_samples, num_loops), dtype=bool)
+        self._pos = 0
+        self.change_counts = np.zeros(num_loops, dtype=np.int64)
+        self.last_value = np.full(num_loops, np.nan)
+        self.last_direction = np.zeros(num_loops)
+        self._direction = np.zeros(num_loops)
+        self._event = np.zeros(num_loops, dtype=bool)
+        self._present = np.zeros(num_loops, dtype=bool)
+
+    def update(self, values):
+        """
+        Feed one sample per loop. Returns (change_counts, hunting) arrays;
+        change_counts is the detector's buffer and updates in place. A NaN
+        value means no sample for that loop: no event, and last_value is
+        kept for the next reading.
+        """
+        values = np.asarray(values, dtype=float)
+        event = self._event
+        present = self._present
+        np.isnan(values, out=present)
+        np.logical_not(present, out=present)
+
+        with np.errstate(invalid="ignore"):
+            if self.mode == STATE_MODE:
+                np.not_equal(values, self.last_value, out=event)
+                event &= ~np.isnan(self.last_value)
+                event &= present
+            else:
+                delta = values - self.last_value
+                direction = self._direction
+                direction.fill(0.0)
+                direction[delta > self.deadband] = 1.0
+                direction[delta < -self.deadband] = -1.0
+                np.not_equal(direction, self.last_direction, out=event)
+                event &= (direction != 0.0) & (self.last_direction != 0.0)
+                moved = direction != 0.0
+                self.last_direction[moved] = direction[moved]
+
+        # Slide the window: drop the oldest event, add the newest
+        self.change_counts -= self._events[self._pos]
+        self.change_counts += event
+        self._events[self._pos] = event
+        self._pos = (self._pos + 1) % self.window_samples
+
+        np.copyto(self.last_value, values, where=present)
+        return self.change_counts, self.change_counts > self.max_changes
+
+
+def generate_oscillation_trends(num_loops, num_samples, freq="1min", seed=0):
+    """
+    Synthetic PID outputs. The first half of the loops hunt with a 10
+    minute oscillation, the rest follow a slow load change with noise
+    smaller than the deadband.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples)[:, None]
+    hunting = num_loops // 2
+
+    values = 50.0 + 10.0 * np.sin(2 * np.pi * t / 240.0) + rng.normal(
+        0.0, OUTPUT_DEADBAND / 4, (num_samples, num_loops)
+    )
+    values[:, :hunting] += 20.0 * np.sin(
+        2 * np.pi * t / 10.0 + rng.uniform(0, 2 * np.pi, hunting)
+    )
+    return pd.DataFrame(
+        np.clip(values, 0.0, 100.0),
+        index=pd.date_range("2024-01-15", periods=num_samples, freq=freq),
+        columns=[f"VAV-{i}" for i in range(num_loops)],
+    )
+
+
+def generate_state_trends(num_loops, num_samples, freq="1min", dropout=3, seed=0):
+    """
+    Synthetic operating state codes with missing readings. The first half
+    of the loops switch between heating (1) and economizer (2) every 4
+    samples, the rest hold economizer. Every dropout-th sample is NaN for
+    all loops, plus 10% random dropouts.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples)[:, None]
+    hunting = np.arange(num_loops) < num_loops // 2
+
+    values = np.where(hunting, 1.0 + (t // 4) % 2, 2.0)
+    values[dropout - 1 :: dropout] = np.nan
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return pd.DataFrame(
+        values,
+        index=pd.date_range("2024-01-15", periods=num_samples, freq=freq),
+        columns=[f"AHU-{i}" for i in range(num_loops)],
+    )
+
+
+def _check_batch_matches_streaming(trends, mode, expected):
+    """
+    Run both detectors over trends and log their throughput. Returns a
+    list of failures: the change counts must match on every sample, and
+    both must flag exactly the expected loops.
+    """
+    num_samples, num_loops = trends.shape
+    total_samples = num_samples * num_loops
+
+    start = time.perf_counter()
+    change_counts, hunting = detect_hunting_batch(
+        trends, mode=mode, window=WINDOW_SAMPLES
+    )
+    elapsed = time.perf_counter() - start
+    flagged = hunting.any().to_numpy()
+    logger.info("Batch %s: %s samples/sec", mode, f"{total_samples / elapsed:,.0f}")
+    logger.info("  Hunting loops flagged: %.0f%%", 100 * flagged[expected].mean())
+    logger.info("  Stable loops flagged: %.0f%%", 100 * flagged[~expected].mean())
+
+    detector = HuntingDetector(num_loops, mode=mode)
+    values = trends.to_numpy()
+    stream_counts = np.empty(values.shape, dtype=change_counts.to_numpy().dtype)
+    stream_flagged = np.zeros(num_loops, dtype=bool)
+    start = time.perf_counter()
+    for i, row in enumerate(values):
+        counts, is_hunting = detector.update(row)
+        stream_counts[i] = counts
+        stream_flagged |= is_hunting
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Streaming %s: %s samples/sec", mode, f"{total_samples / elapsed:,.0f}"
+    )
+    logger.info("  Hunting loops flagged: %.0f%%", 100 * stream_flagged[expected].mean())
+    logger.info("  Stable loops flagged: %.0f%%", 100 * stream_flagged[~expected].mean())
+
+    failures = []
+    mismatched_rows = (stream_counts != change_counts.to_numpy()).any(axis=1)
+    if mismatched_rows.any():
+        failures.append(
+            f"{mode}: streaming counts differ from batch on "
+            f"{mismatched_rows.sum()} of {num_samples} samples, "
+            f"first at {trends.index[mismatched_rows.argmax()]}"
+        )
+    for name, mode_flagged in (("batch", flagged), ("streaming", stream_flagged)):
+        if not mode_flagged[expected].all():
+            failures.append(f"{mode}: {name} missed a hunting loop")
+        if mode_flagged[~expected].any():
+            failures.append(f"{mode}: {name} flagged a stable loop")
+    return failures
+
+
+if __name__ == "__main__":
+    NUM_LOOPS = 2000
+    NUM_SAMPLES = 24 * 60  # One day of 1 minute data
+
+    aso_metrics.configure_logging()
+    logger.info("Generating %s samples for %s loops...", NUM_SAMPLES, NUM_LOOPS)
+    expected = np.arange(NUM_LOOPS) < NUM_LOOPS // 2
+
+    # Batch and streaming must give the same change count on every sample,
+    # and both must flag exactly the oscillating loops, including on a
+    # state trend full of missing readings
+    failures = _check_batch_matches_streaming(
+        generate_oscillation_trends(NUM_LOOPS, NUM_SAMPLES), DIRECTION_MODE, expected
+    )
+    failures += _check_batch_matches_streaming(
+        generate_state_trends(NUM_LOOPS, NUM_SAMPLES), STATE_MODE, expected
+    )
+    for failure in failures:
+        logger.error("FAIL: %s", failure)
+    if failures:
+        sys.exit(1)
+    logger.info("Batch and streaming checks passed")
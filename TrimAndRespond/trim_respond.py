@@ -0,0 +1,55 @@
+"""
+Shared G36 trim and respond (T&R) core.
+
+Every function works on NumPy arrays (or plain scalars), so one call can
+evaluate a single AHU or every plant and request source in a building in
+one batch. The SAT reset, duct static pressure reset and boiler plant
+hot water reset simulators all use these functions.
+"""
+
+import numpy as np
+
+
+def threshold_requests(values, threshold):
+    """
+    One request per source whose value is at or above threshold, e.g. zone
+    temperature >= HighZoneTempSpt or damper position >= HighDamperSpt.
+    """
+    return (np.asarray(values) >= threshold).astype(np.int64)
+
+
+def net_requests(requests, ignore, plant_idx=None, num_plants=None):
+    """
+    Total requests per plant after ignoring the first `ignore` requests.
+
+    requests holds the request count of each source. With plant_idx=None
+    the last axis is summed (one plant per row). Otherwise requests is a
+    flat array of every source in the building and plant_idx maps each
+    source to its plant, so any number of plants with any number of
+    sources are totaled in one bincount.
+    """
+    requests = np.asarray(requests)
+    if plant_idx is None:
+        total = requests.sum(axis=-1)
+    else:
+        total = np.bincount(plant_idx, weights=requests, minlength=num_plants)
+    return np.maximum(total - np.asarray(ignore), 0).astype(np.int64)
+
+
+def trim_respond(setpoint, num_requests, sp_trim, sp_res, sp_res_max, sp_min, sp_max):
+    """
+    Trim when there are no net requests, otherwise respond in proportion
+    to the number of requests. The adjustment is capped at +/- sp_res_max
+    and the new setpoint is clamped to [sp_min, sp_max].
+
+    All arguments broadcast, so per-plant limits can be arrays. Returns
+    (new_setpoint, adjustment).
+    """
+    num_requests = np.asarray(num_requests)
+    adjustment = np.where(
+        num_requests == 0, sp_trim, np.multiply(sp_res, num_requests)
+    )
+    sp_res_max = np.abs(sp_res_max)
+    adjustment = np.clip(adjustment, -sp_res_max, sp_res_max)
+    new_setpoint = np.clip(np.add(setpoint, adjustment), sp_min, sp_max)
+    return new_setpoint, adjustment